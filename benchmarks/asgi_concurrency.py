@@ -0,0 +1,129 @@
+"""
+Concurrency benchmark of the async serving mode.
+
+Starts uvicorn with a single worker twice: once with ASYNC_ROUTES_ENABLED off,
+so every request runs on the ASYNC_WSGI_THREADS threads as under a threaded
+WSGI server, and once with the read routes on the event loop. Each is driven
+with the read routes of load.py at increasing client concurrency and the
+latency percentiles and throughput of both are printed side by side.
+
+APP_CONFIG_FILE must point at the configuration of a database loaded by
+generate.py. The response cache is turned off in both runs so every request
+reaches the database.
+
+    python benchmarks/asgi_concurrency.py [--concurrency 1,8,32,128] [--requests 400]
+                                          [--venues 100000] [--artists 100000]
+                                          [--port 5100] [--output run.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from load import ROUTES, Client, run_route
+
+# routes served on the event loop in async mode
+READ_ROUTES = ("venues", "show_venue", "search_venues", "artists", "show_artist",
+               "search_artists", "shows")
+MODES = (("threads", False), ("async", True))
+
+
+def _wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit("uvicorn exited with status {}".format(process.returncode))
+        try:
+            urllib.request.urlopen(url + "/", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    sys.exit("uvicorn did not start within {} seconds".format(timeout))
+
+
+def serve(config_file, async_routes, port):
+    """Start uvicorn on port with the configuration of config_file; return the process."""
+    with open(config_file) as f:
+        config = f.read()
+    override = tempfile.NamedTemporaryFile("w", suffix=".cfg", delete=False)
+    with override:
+        override.write(config)
+        # a cache that keeps nothing: both modes render every page
+        override.write("\nASYNC_ROUTES_ENABLED = {}\nRESPONSE_CACHE_MAX_ENTRIES = 0\n".format(
+            async_routes))
+    env = dict(os.environ, APP_CONFIG_FILE=override.name)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fyyur.asgi:app", "--port", str(port), "--workers", "1",
+         "--log-level", "warning"],
+        env=env, cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    process.config_file = override.name
+    return process
+
+
+def stop(process):
+    process.terminate()
+    process.wait()
+    os.unlink(process.config_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", default="1,8,32,128",
+                        help="Comma separated numbers of concurrent clients.")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per route and level.")
+    parser.add_argument("--venues", type=int, default=100000,
+                        help="Venue ids are picked from 1 to this number.")
+    parser.add_argument("--artists", type=int, default=100000,
+                        help="Artist ids are picked from 1 to this number.")
+    parser.add_argument("--routes", default=",".join(READ_ROUTES),
+                        help="Comma separated route names.")
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+    if "APP_CONFIG_FILE" not in os.environ:
+        sys.exit("APP_CONFIG_FILE must be set")
+
+    routes = [route for route in ROUTES if route[0] in args.routes.split(",")]
+    levels = [int(level) for level in args.concurrency.split(",")]
+    url = "http://127.0.0.1:{}".format(args.port)
+    # mode -> concurrency -> route -> result
+    results = {}
+    for mode, async_routes in MODES:
+        process = serve(os.environ["APP_CONFIG_FILE"], async_routes, args.port)
+        try:
+            _wait_until_up(url, process)
+            results[mode] = {}
+            for concurrency in levels:
+                args.concurrency = concurrency
+                client = Client(url, args.timeout)
+                results[mode][concurrency] = {
+                    route[0]: run_route(client, route, args, args.seed + index)
+                    for index, route in enumerate(routes)
+                }
+        finally:
+            stop(process)
+
+    print("{:<16} {:>6} {:>20} {:>20} {:>20} {:>20}".format(
+        "route", "conc", "req/s threads/async", "p50 ms", "p95 ms", "p99 ms"))
+    for route in routes:
+        for concurrency in levels:
+            threads = results["threads"][concurrency][route[0]]
+            async_ = results["async"][concurrency][route[0]]
+            print("{:<16} {:>6} {:>20} {:>20} {:>20} {:>20}".format(
+                route[0], concurrency, *["{:.1f}/{:.1f}".format(threads[key], async_[key])
+                                         for key in ("throughput", "p50_ms", "p95_ms", "p99_ms")]))
+            if threads["errors"] or async_["errors"]:
+                print("  errors: {} threads, {} async".format(threads["errors"], async_["errors"]))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
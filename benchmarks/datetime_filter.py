@@ -0,0 +1,61 @@
+"""
+Micro-benchmark of the `datetime` Jinja filter, per rendered row.
+
+Compares the previous pipeline, where views formatted start_time with
+strftime and the filter parsed it back with dateutil before calling
+babel.dates.format_datetime, with fyyur.filters.format_datetime applied
+directly to the datetime.
+
+    python benchmarks/datetime_filter.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+import pytz
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from fyyur.filters import format_datetime  # noqa: E402
+
+
+def previous_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    start = datetime(2035, 4, 1, 20, tzinfo=pytz.utc)
+    start_times = [start + timedelta(hours=i) for i in range(args.rows)]
+
+    def before():
+        for start_time in start_times:
+            previous_format_datetime(start_time.strftime("%Y-%m-%dT%X"), 'full')
+
+    def after():
+        for start_time in start_times:
+            format_datetime(start_time, 'full')
+
+    # both pipelines must render the same text
+    assert all(
+        previous_format_datetime(t.strftime("%Y-%m-%dT%X"), 'full') == format_datetime(t, 'full')
+        for t in start_times[:100])
+    for name, run in (("before", before), ("after", after)):
+        best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print("{:<7} {:8.2f} us/row".format(name, best / args.rows * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+Synthetic large catalog for the load benchmark.
+
+Venues, artists and shows are drawn column by column from a seeded numpy
+generator, so the same seed always yields the same catalog, and are loaded
+with the COPY path of `flask data import`. Ids are assigned after the
+largest id already in each table, so a catalog can be generated into a
+database that already has data. With --out the rows are written as CSV
+files that `flask data import` loads later, instead of into the database.
+
+    python benchmarks/generate.py [--venues 100000] [--artists 100000] [--shows 2000000]
+                                  [--seed 42] [--database-url URL | --out DIR]
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+from fyyur import create_app, db  # noqa: E402
+from fyyur.bulk import _csv_value, import_rows, model_columns  # noqa: E402
+from fyyur.forms import GENRES, STATES  # noqa: E402
+from fyyur.models import Artist, Show, Venue  # noqa: E402
+
+WORDS = np.array([
+    "Blue", "Velvet", "Electric", "Golden", "Midnight", "Silver", "Crimson", "Neon", "Wild",
+    "Hollow", "Lucky", "Iron", "Paper", "Echo", "Static", "Little", "Royal", "Black", "Copper",
+    "Rusty", "Lonely", "Broken", "Northern", "Southern", "Cosmic", "Honey", "Thunder", "Violet"
+])
+VENUE_NOUNS = np.array(["Hall", "Room", "Lounge", "Theatre", "Club", "Tavern", "Garden", "Arena"])
+ARTIST_NOUNS = np.array(["Band", "Collective", "Trio", "Quartet", "Orchestra", "Kids", "Brothers"])
+STREETS = np.array(["Main St", "Market St", "Oak Ave", "Mission St", "Broadway", "Elm St"])
+CITIES = np.array([
+    "San Francisco", "New York", "Chicago", "Austin", "Seattle", "Nashville", "Portland",
+    "Denver", "Atlanta", "Boston", "Detroit", "New Orleans", "Los Angeles", "Miami"
+])
+STATE_CODES = np.array([code for code, _ in STATES])
+GENRE_NAMES = np.array([name for name, _ in GENRES])
+# shows start between two years ago and one year ahead, on the quarter hour
+SHOWS_FROM = timedelta(days=-730)
+SHOWS_TO = timedelta(days=365)
+
+
+def _names(rng, size, nouns, first_id):
+    # the id suffix keeps names unique however small the word lists are
+    words = np.char.add(np.char.add(WORDS[rng.integers(len(WORDS), size=size)], " "),
+                        nouns[rng.integers(len(nouns), size=size)])
+    return np.char.add(np.char.add(words, " #"), np.arange(first_id, first_id + size).astype(str))
+
+
+def _genres(rng, size):
+    """Return a list of one to three distinct genres per row."""
+    # the first k columns of a random permutation of the genres per row
+    order = np.argsort(rng.random((size, len(GENRE_NAMES))), axis=1)
+    counts = rng.integers(1, 4, size=size)
+    picked = GENRE_NAMES[order[:, :3]].tolist()
+    return [genres[:count] for genres, count in zip(picked, counts.tolist())]
+
+
+def _phones(rng, size):
+    return rng.integers(2000000000, 9999999999, size=size).astype(str)
+
+
+def _entities(rng, size, first_id, nouns, seeking):
+    """Return the columns of size venues or artists as a dict of lists."""
+    ids = np.arange(first_id, first_id + size)
+    columns = {
+        "id": ids,
+        "name": _names(rng, size, nouns, first_id),
+        "genres": _genres(rng, size),
+        "city": CITIES[rng.integers(len(CITIES), size=size)],
+        "state": STATE_CODES[rng.integers(len(STATE_CODES), size=size)],
+        "phone": _phones(rng, size),
+        "website": np.char.add("https://example.com/", ids.astype(str)),
+        "facebook_link": np.char.add("https://www.facebook.com/", ids.astype(str)),
+        "image_link": np.char.add("https://picsum.photos/seed/", ids.astype(str)),
+        seeking: rng.random(size) < 0.3,
+        "seeking_description": np.full(size, "Looking for new acts"),
+    }
+    return {name: list(values) if isinstance(values, list) else values.tolist()
+            for name, values in columns.items()}
+
+
+def _venues(rng, size, first_id):
+    columns = _entities(rng, size, first_id, VENUE_NOUNS, "seeking_talent")
+    columns["address"] = np.char.add(
+        rng.integers(1, 3000, size=size).astype(str),
+        np.char.add(" ", STREETS[rng.integers(len(STREETS), size=size)])).tolist()
+    return columns
+
+
+def _artists(rng, size, first_id):
+    return _entities(rng, size, first_id, ARTIST_NOUNS, "seeking_venue")
+
+
+def _shows(rng, size, first_id, venue_ids, artist_ids, now):
+    quarter_hours = rng.integers(SHOWS_FROM // timedelta(minutes=15),
+                                 SHOWS_TO // timedelta(minutes=15), size=size)
+    # datetime64 arithmetic, converted to aware datetimes for COPY
+    start_times = (np.datetime64(now.replace(tzinfo=None, second=0, microsecond=0), "m") +
+                   quarter_hours * np.timedelta64(15, "m")).astype(datetime)
+    return {
+        "id": np.arange(first_id, first_id + size).tolist(),
+        "venue_id": rng.integers(venue_ids[0], venue_ids[1], size=size).tolist(),
+        "artist_id": rng.integers(artist_ids[0], artist_ids[1], size=size).tolist(),
+        "start_time": [start_time.replace(tzinfo=timezone.utc) for start_time in start_times],
+    }
+
+
+def _rows(columns):
+    """Turn a dict of equally long column lists into row dicts."""
+    names = list(columns)
+    return (dict(zip(names, values)) for values in zip(*columns.values()))
+
+
+def _batches(build, rng, total, batch_size, first_id):
+    """Yield row dicts of total entities built batch_size at a time."""
+    for offset in range(0, total, batch_size):
+        size = min(batch_size, total - offset)
+        for row in _rows(build(rng, size, first_id + offset)):
+            yield row
+
+
+class CsvTarget(object):
+    """Writes each table to DIR/<table>.csv in the format `flask data import` reads."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def first_id(self, model):
+        return 1
+
+    def load(self, model, rows, batch_size):
+        path = os.path.join(self.directory, model.__tablename__ + ".csv")
+        columns = model_columns(model)
+        count = 0
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for count, row in enumerate(rows, 1):
+                writer.writerow([_csv_value(row.get(column)) for column in columns])
+        return count
+
+
+class DatabaseTarget(object):
+    """Loads each table with COPY through fyyur.bulk.import_rows."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def first_id(self, model):
+        with self.app.app_context():
+            return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+    def load(self, model, rows, batch_size):
+        loaded = 0
+        with self.app.app_context():
+            for loaded, skipped in import_rows(model, rows, batch_size):
+                pass
+        return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--venues", type=int, default=100000)
+    parser.add_argument("--artists", type=int, default=100000)
+    parser.add_argument("--shows", type=int, default=2000000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=50000,
+                        help="Rows generated and copied per batch.")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--database-url",
+                        help="Database to load into; the app configuration by default.")
+    target.add_argument("--out", help="Write CSV files to this directory instead of loading.")
+    args = parser.parse_args()
+
+    if args.out:
+        target = CsvTarget(args.out)
+    elif args.database_url:
+        target = DatabaseTarget(create_app({"SQLALCHEMY_DATABASE_URI": args.database_url,
+                                            "SQLALCHEMY_TRACK_MODIFICATIONS": False}))
+    else:
+        target = DatabaseTarget(create_app())
+    rng = np.random.default_rng(args.seed)
+    now = datetime.now(timezone.utc)
+
+    first_venue = target.first_id(Venue)
+    first_artist = target.first_id(Artist)
+    first_show = target.first_id(Show)
+    plan = [
+        (Venue, args.venues, first_venue, _venues),
+        (Artist, args.artists, first_artist, _artists),
+        (Show, args.shows, first_show, lambda rng, size, first_id: _shows(
+            rng, size, first_id, (first_venue, first_venue + args.venues),
+            (first_artist, first_artist + args.artists), now)),
+    ]
+    for model, total, first_id, build in plan:
+        start = time.perf_counter()
+        loaded = target.load(model, _batches(build, rng, total, args.batch_size, first_id),
+                             args.batch_size)
+        elapsed = time.perf_counter() - start
+        print("{:<8} {:>12,} rows in {:6.1f}s ({:,.0f} rows/s)".format(
+            model.__tablename__, loaded, elapsed, loaded / elapsed if elapsed else 0))
+
+
+if __name__ == '__main__':
+    main()
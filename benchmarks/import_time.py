@@ -0,0 +1,60 @@
+"""
+Cold start benchmark of the fyyur package, measured with `python -X importtime`.
+
+Each run starts a fresh interpreter that imports fyyur and builds the app with
+create_app(), so nothing is cached in the process between runs. Reports the
+best wall time of `import fyyur` and of create_app(), and the modules with
+the largest cumulative import time in the fastest run.
+
+    python benchmarks/import_time.py [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+PROGRAM = """
+import time
+start = time.perf_counter()
+import fyyur
+imported = time.perf_counter()
+fyyur.create_app({'SQLALCHEMY_DATABASE_URI': 'postgresql://localhost/fyyur',
+                  'SQLALCHEMY_TRACK_MODIFICATIONS': False})
+created = time.perf_counter()
+print(imported - start, created - imported)
+"""
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def run_once():
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", PROGRAM],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    import_seconds, create_seconds = map(float, result.stdout.split())
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules.append((int(match.group(2)), match.group(4)))
+    return import_seconds, create_seconds, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    import_seconds, create_seconds, modules = min(runs, key=lambda run: run[0])
+    print("import fyyur  {:8.1f} ms".format(import_seconds * 1e3))
+    print("create_app()  {:8.1f} ms".format(create_seconds * 1e3))
+    print("\nslowest imports (cumulative):")
+    for cumulative, module in sorted(modules, reverse=True)[:args.top]:
+        print("  {:8.1f} ms  {}".format(cumulative / 1e3, module))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+Route level load benchmark of a running fyyur server.
+
+Every GET and POST route is driven in turn by a pool of concurrent clients
+with keep-alive connections, picking venue and artist ids at random from the
+catalog built by generate.py. For each route the latency percentiles,
+throughput, error count and SQL statements per request are reported. Query
+counts are read from the Server-Timing header, so start the server with
+METRICS_DEBUG_HEADER = True (or in debug mode) to get them.
+
+Results are written as JSON with --output. With --baseline the run is
+compared with an earlier one and the exit status is 1 when the p95 latency
+or the query count of a route regressed by more than --threshold.
+
+    python benchmarks/load.py [--url http://127.0.0.1:5000] [--concurrency 8]
+                              [--requests 200] [--venues 100000] [--artists 100000]
+                              [--routes show_venue,shows] [--output run.json]
+                              [--baseline baseline.json] [--threshold 0.1]
+"""
+import argparse
+import http.client
+import json
+import math
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+# db;dur=1.17;desc="2 queries", ...
+QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+ENTITY_FORM = {
+    "city": "San Francisco", "state": "CA", "phone": "4155550100",
+    "genres": ["Jazz", "Folk"], "website": "https://example.com",
+    "image_link": "https://picsum.photos/seed/fyyur",
+    "facebook_link": "https://www.facebook.com/fyyur",
+    "seeking_description": "Benchmark"
+}
+
+
+def _venue_form(rng, args):
+    return dict(ENTITY_FORM, name="Benchmark Hall {}".format(rng.getrandbits(32)),
+                address="1 Main St", seeking_talent="y")
+
+
+def _artist_form(rng, args):
+    return dict(ENTITY_FORM, name="Benchmark Band {}".format(rng.getrandbits(32)),
+                seeking_venue="y")
+
+
+def _show_form(rng, args):
+    start_time = datetime.now() + timedelta(days=rng.randint(1, 365))
+    return {
+        "venue_id": rng.randint(1, args.venues), "artist_id": rng.randint(1, args.artists),
+        "start_time": start_time.strftime("%Y-%m-%d %H:%M:%S"), "time_zone": "US/Pacific"
+    }
+
+
+def _search_form(rng, args):
+    return {"search_term": rng.choice(["blue", "hall", "band", "#12", "neon", "zzz"])}
+
+
+# name -> (method, path, form); path and form are built from a random generator and the args
+ROUTES = [
+    ("index", "GET", lambda rng, args: "/", None),
+    ("venues", "GET", lambda rng, args: "/venues", None),
+    ("show_venue", "GET", lambda rng, args: "/venues/{}".format(rng.randint(1, args.venues)), None),
+    ("search_venues", "POST", lambda rng, args: "/venues/search", _search_form),
+    ("create_venue_form", "GET", lambda rng, args: "/venues/create", None),
+    ("create_venue_submission", "POST", lambda rng, args: "/venues/create", _venue_form),
+    ("edit_venue", "GET",
+     lambda rng, args: "/venues/{}/edit".format(rng.randint(1, args.venues)), None),
+    ("edit_venue_submission", "POST",
+     lambda rng, args: "/venues/{}/edit".format(rng.randint(1, args.venues)), _venue_form),
+    ("artists", "GET", lambda rng, args: "/artists", None),
+    ("show_artist", "GET",
+     lambda rng, args: "/artists/{}".format(rng.randint(1, args.artists)), None),
+    ("search_artists", "POST", lambda rng, args: "/artists/search", _search_form),
+    ("create_artist_form", "GET", lambda rng, args: "/artists/create", None),
+    ("create_artist_submission", "POST", lambda rng, args: "/artists/create", _artist_form),
+    ("edit_artist", "GET",
+     lambda rng, args: "/artists/{}/edit".format(rng.randint(1, args.artists)), None),
+    ("edit_artist_submission", "POST",
+     lambda rng, args: "/artists/{}/edit".format(rng.randint(1, args.artists)), _artist_form),
+    ("shows", "GET", lambda rng, args: "/shows", None),
+    ("create_shows", "GET", lambda rng, args: "/shows/create", None),
+    ("create_show_submission", "POST", lambda rng, args: "/shows/create", _show_form),
+    ("export_venues", "GET", lambda rng, args: "/export/venues.ndjson", None),
+    ("export_artists", "GET", lambda rng, args: "/export/artists.ndjson", None),
+]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(int(math.ceil(fraction * len(sorted_values))) - 1, 0)]
+
+
+class Client(object):
+    """One keep-alive HTTP connection per thread."""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host, self.port, self.timeout = parts.hostname, parts.port or 80, timeout
+        self._local = threading.local()
+
+    def request(self, method, path, form):
+        body = urlencode(form, doseq=True) if form is not None else None
+        headers = {"Content-Type": "application/x-www-form-urlencoded"} if form is not None else {}
+        for attempt in range(2):
+            connection = getattr(self._local, "connection", None)
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout)
+            try:
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status, response.getheader("Server-Timing")
+            except (http.client.HTTPException, OSError):
+                # the server closed an idle keep-alive connection; reconnect once
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+
+def run_route(client, route, args, seed):
+    """Send args.requests requests of route from args.concurrency threads."""
+    name, method, path, form = route
+    rng = random.Random(seed)
+    # build every request up front so the generator is not shared between threads
+    requests = [(path(rng, args), form(rng, args) if form else None) for _ in range(args.requests)]
+
+    def send(request):
+        start = time.perf_counter()
+        try:
+            status, server_timing = client.request(method, *request)
+        except (http.client.HTTPException, OSError):
+            return time.perf_counter() - start, None, None
+        match = QUERY_COUNT.search(server_timing or "")
+        return time.perf_counter() - start, status, int(match.group(1)) if match else None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        results = list(executor.map(send, requests))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, _, _ in results)
+    queries = [count for _, _, count in results if count is not None]
+    return {
+        "method": method,
+        "requests": len(results),
+        # redirects are the success response of the form submissions
+        "errors": sum(1 for _, status, _ in results if status is None or status >= 400),
+        "throughput": len(results) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p95_ms": percentile(latencies, 0.95) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+        "queries_mean": sum(queries) / len(queries) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every route against baseline; return the regressed routes."""
+    regressed = []
+    print("\n{:<26} {:>12} {:>12} {:>8} {:>10}".format("vs baseline", "p95 before", "p95 after",
+                                                        "change", "queries"))
+    for name, result in results["routes"].items():
+        before = baseline["routes"].get(name)
+        if before is None:
+            continue
+        change = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0
+        queries = "{}->{}".format(before["queries_max"], result["queries_max"])
+        more_queries = (result["queries_max"] or 0) > (before["queries_max"] or 0)
+        flag = change > threshold or more_queries
+        if flag:
+            regressed.append(name)
+        print("{:<26} {:>10.1f}ms {:>10.1f}ms {:>+7.0%} {:>10} {}".format(
+            name, before["p95_ms"], result["p95_ms"], change, queries, "REGRESSED" if flag else ""))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route.")
+    parser.add_argument("--venues", type=int, default=100000,
+                        help="Venue ids are picked from 1 to this number.")
+    parser.add_argument("--artists", type=int, default=100000,
+                        help="Artist ids are picked from 1 to this number.")
+    parser.add_argument("--routes", help="Comma separated route names; all routes by default.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare with the results in this JSON file.")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative p95 increase counted as a regression.")
+    args = parser.parse_args()
+
+    routes = [(name, method, path, form) for name, method, path, form in ROUTES
+              if args.routes is None or name in args.routes.split(",")]
+    client = Client(args.url, args.timeout)
+    results = {
+        "url": args.url, "revision": _git_revision(), "time": datetime.now().isoformat(),
+        "concurrency": args.concurrency, "requests": args.requests, "routes": {}
+    }
+    print("{:<26} {:>8} {:>9} {:>9} {:>9} {:>9} {:>7} {:>7}".format(
+        "route", "req/s", "p50 ms", "p95 ms", "p99 ms", "queries", "max q", "errors"))
+    for index, route in enumerate(routes):
+        result = run_route(client, route, args, args.seed + index)
+        results["routes"][route[0]] = result
+        print("{:<26} {:>8.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>9} {:>7} {:>7}".format(
+            route[0], result["throughput"], result["p50_ms"], result["p95_ms"], result["p99_ms"],
+            "-" if result["queries_mean"] is None else "{:.1f}".format(result["queries_mean"]),
+            "-" if result["queries_max"] is None else result["queries_max"], result["errors"]))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressed = compare(results, json.load(f), args.threshold)
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
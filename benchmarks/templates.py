@@ -0,0 +1,111 @@
+"""
+Benchmark of template compilation and fragment caching.
+
+Cold start: each run starts a fresh interpreter, builds the app and renders
+a venue page once, with no bytecode cache and then with a cache filled by
+compile_templates(), as `flask templates compile` does at deploy time.
+Reports the best time from create_app() to the first rendered page of each;
+imports are done before and not counted.
+
+Warm renders: renders a venue page with --shows upcoming and past shows
+repeatedly in one process, with fragment caching off and with its
+fragments cached, and reports the time per render.
+
+No database is needed; the pages are rendered from generated data.
+
+    python benchmarks/templates.py [--runs 5] [--shows 50] [--renders 200]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+
+import pytz
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+from fyyur import create_app  # noqa: E402
+from fyyur.templating import compile_templates  # noqa: E402
+
+CONFIG = {'SQLALCHEMY_DATABASE_URI': 'postgresql://localhost/fyyur',
+          'SQLALCHEMY_TRACK_MODIFICATIONS': False}
+PROGRAM = """
+import sys, time
+sys.path.insert(0, {root!r})
+from benchmarks.templates import render_venue_page
+from fyyur import create_app
+start = time.perf_counter()
+app = create_app(dict({config!r}, TEMPLATE_BYTECODE_CACHE_DIR={cache_dir!r}))
+render_venue_page(app, 50)
+print(time.perf_counter() - start)
+"""
+
+
+def venue_data(shows):
+    """Return the context of a venue page listing shows upcoming and shows past shows."""
+    now = datetime(2035, 4, 1, 20, tzinfo=pytz.utc)
+    updated = now - timedelta(days=30)
+
+    def show(index):
+        return {"artist_id": index, "artist_name": "Artist {}".format(index),
+                "artist_image_link": "https://example.com/{}.jpg".format(index),
+                "artist_updated": updated, "start_time": now + timedelta(days=index)}
+
+    return {
+        "id": 1, "name": "The Venue", "genres": ["Jazz", "Folk", "Blues"], "address": "1 Main St",
+        "city": "San Francisco", "state": "CA", "phone": "4155550100",
+        "website": "https://example.com", "facebook_link": "https://facebook.com/venue",
+        "image_link": "https://example.com/venue.jpg", "seeking_talent": True,
+        "seeking_description": "Looking for jazz acts", "time_updated": updated,
+        "upcoming_shows": [show(i) for i in range(shows)], "upcoming_shows_count": shows,
+        "past_shows": [show(-i) for i in range(1, shows + 1)], "past_shows_count": shows,
+    }
+
+
+def render_venue_page(app, shows, data=None):
+    data = data or venue_data(shows)
+    with app.test_request_context('/venues/1'):
+        return app.jinja_env.get_template('pages/show_venue.html').render(venue=data)
+
+
+def cold_start(cache_dir, runs):
+    program = PROGRAM.format(root=ROOT, config=CONFIG, cache_dir=cache_dir)
+    return min(float(subprocess.run([sys.executable, "-c", program], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout)
+               for _ in range(runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Interpreters started per variant.")
+    parser.add_argument("--shows", type=int, default=50,
+                        help="Upcoming and past shows on the venue page.")
+    parser.add_argument("--renders", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        compile_templates(create_app(dict(CONFIG, TEMPLATE_BYTECODE_CACHE_DIR=cache_dir)))
+        print("{:<28} {:8.1f} ms".format("first page, compiling",
+                                         cold_start(None, args.runs) * 1e3))
+        print("{:<28} {:8.1f} ms".format("first page, precompiled",
+                                         cold_start(cache_dir, args.runs) * 1e3))
+
+    data = venue_data(args.shows)
+    pages = []
+    for name, max_entries in (("render, no fragments", 0), ("render, cached fragments", 10000)):
+        app = create_app(dict(CONFIG, TEMPLATE_BYTECODE_CACHE_DIR=None,
+                              FRAGMENT_CACHE_MAX_ENTRIES=max_entries))
+        # fills the template cache and the fragment cache
+        pages.append(render_venue_page(app, args.shows, data))
+        best = min(timeit.repeat(lambda: render_venue_page(app, args.shows, data),
+                                 number=args.renders, repeat=5))
+        print("{:<28} {:8.1f} us".format(name, best / args.renders * 1e6))
+    # cached fragments must render the same page
+    assert pages[0] == pages[1]
+
+
+if __name__ == '__main__':
+    main()
@@ -11,3 +11,88 @@ THREADS_PER_PAGE = 2
 
 # Enable protection agains *Cross-site Request Forgery (CSRF)*
 CSRF_ENABLED = True
+
+# Read replicas of SQLALCHEMY_DATABASE_URI, e.g.
+# ['postgresql://fyyur@replica1/fyyur?connect_timeout=2']. The read-only views
+# read from them in turn, skipping those failing the health check run every
+# REPLICA_CHECK_INTERVAL seconds; a client that has just written reads from
+# the primary for REPLICA_READ_YOUR_WRITES_SECONDS, which must exceed the lag,
+# and pages read from a replica are not cached for as long after invalidation
+SQLALCHEMY_REPLICA_URIS = []
+REPLICA_CHECK_INTERVAL = 10
+REPLICA_READ_YOUR_WRITES_SECONDS = 10
+
+# Maximum number of upcoming and of past shows listed on a venue or artist page
+DETAIL_SHOWS_LIMIT = 50
+
+# seconds a reverse proxy may serve a venue or artist page without revalidating
+# it; never longer than until the next show listed on the page starts
+DETAIL_PAGE_S_MAXAGE = 60
+
+# Default and maximum number of results per page of venue/artist search
+SEARCH_RESULTS_LIMIT = 20
+SEARCH_RESULTS_MAX_LIMIT = 100
+
+# Number of rows per page of the /artists and /shows listings
+LIST_PAGE_LIMIT = 50
+# Largest page of a listing the JSON API returns; LIST_PAGE_LIMIT is the default
+API_PAGE_MAX_LIMIT = 500
+# Number of rows fetched per round trip when a listing is streamed
+STREAM_BATCH_SIZE = 500
+
+# Largest number of shows scheduled by one batch, rows and rule occurrences together
+SHOW_BATCH_MAX_ROWS = 1000
+
+# Number of rows fetched per round trip by the export endpoints
+EXPORT_BATCH_SIZE = 5000
+
+# Background jobs run on JOBS_WORKERS threads of each worker process, which
+# keeps the progress of the last JOBS_HISTORY jobs it queued for /jobs/<id>
+JOBS_WORKERS = 2
+JOBS_HISTORY = 100
+# Shows deleted per statement and commit when a deleted venue or artist is purged
+PURGE_BATCH_SIZE = 1000
+
+# Response cache of the read-heavy pages. RESPONSE_CACHE_SERVER is the
+# (host, port) of a `flask cache-server` shared by all workers, or None to
+# keep an in-process cache per worker. Set it whenever the app runs in more
+# than one process: a write only invalidates the in-process cache of the
+# worker handling it, and the others serve the old page for up to the TTL
+RESPONSE_CACHE_SERVER = None
+RESPONSE_CACHE_AUTHKEY = "secret"
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+# seconds; pages listing upcoming shows expire earlier when one of them starts
+RESPONSE_CACHE_TTL = 300
+
+# Per-request query, database, pool and render timings aggregated per endpoint
+# at /metrics. METRICS_DEBUG_HEADER adds a Server-Timing header to every
+# response, as is always done in debug mode
+METRICS_ENABLED = True
+METRICS_DEBUG_HEADER = False
+
+# Log the statements one request runs NPLUSONE_THRESHOLD times or more, with the
+# code running them, to catch queries issued in loops; always on in debug mode
+NPLUSONE_ENABLED = False
+NPLUSONE_THRESHOLD = 3
+
+# Templates are compiled into TEMPLATE_BYTECODE_CACHE_DIR, relative to the
+# instance folder, and loaded from there by every worker; `flask templates
+# compile` fills it at deploy time. None compiles them in each worker instead
+TEMPLATE_BYTECODE_CACHE_DIR = 'jinja_cache'
+# Rendered per-entity fragments of pages kept by each worker; their keys change
+# with the entities they show, so the TTL only bounds how long unused ones stay
+FRAGMENT_CACHE_MAX_ENTRIES = 10000
+FRAGMENT_CACHE_TTL = 3600
+
+# Serve the static files built by `flask assets build` from static/dist when
+# they exist; turn off to work on the original files without rebuilding
+ASSETS_ENABLED = True
+
+# Async serving mode (fyyur.asgi). The read routes query over at most
+# ASYNC_POOL_SIZE asyncpg connections from the event loop and render their
+# pages on ASYNC_RENDER_THREADS threads; all other requests are run by Flask
+# on ASYNC_WSGI_THREADS threads, every request when ASYNC_ROUTES_ENABLED is off
+ASYNC_ROUTES_ENABLED = True
+ASYNC_POOL_SIZE = 10
+ASYNC_RENDER_THREADS = 4
+ASYNC_WSGI_THREADS = 8
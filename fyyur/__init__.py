@@ -1,42 +1,101 @@
 """
-the Flask application object creation has to be in the __init__.py file.
-That way each module can import it safely and the __name__ variable will
-resolve to the correct package.
+The Flask application is built by create_app() so that importing the package
+has no side effects: no app, no configuration and no database access.
+The extensions below are created unbound and attached to each app in
+create_app(), which lets every module import them safely.
 
 ** all the view functions (the ones with a route() decorator on top)
-have to be imported in the __init__.py file.
-Not the object itself, but the module it is in.
-Import the view module after the application object is created.
+live on the blueprints in views.py and api.py, which are registered by
+create_app().
 """
 # Import flask and template operators
 from flask import Flask
 from flask_moment import Moment
 from flask_migrate import Migrate
-# Import SQLAlchemy
-from flask_sqlalchemy import SQLAlchemy
-
-# ----------------------------------------------------------------------------#
-#  App Config.
-# ----------------------------------------------------------------------------#
-
-# Define the WSGI application object
-app = Flask(__name__, instance_relative_config=True)
-# load the default configuration in config/default.py
-app.config.from_object('config.default')
-# loads configuration from instance/config.py
-app.config.from_pyfile('config.py')
-# APP_CONFIG_FILE should be the absolute path to env specific configuration
-app.config.from_envvar('APP_CONFIG_FILE')
+
+from fyyur.assets import Assets
+from fyyur.cache import ResponseCache
+from fyyur.jobs import JobQueue
+from fyyur.metrics import RequestMetrics
+from fyyur.nplusone import NPlusOneDetector
+# Import SQLAlchemy, with sessions routing reads to the replicas
+from fyyur.routing import ReplicaRouter, RoutingSQLAlchemy
+from fyyur.templating import Templates
 
 # Define the database object which is imported
 # by modules and controllers
-db = SQLAlchemy(app)
+db = RoutingSQLAlchemy()
+
+# replicas of the database, read from by the views decorated with replicas.reads
+replicas = ReplicaRouter()
 
 # initialize flask_migrate
-migrate = Migrate(app, db)
+migrate = Migrate()
 
 # Flask Moment for datetime formatting
-moment = Moment(app)
+moment = Moment()
+
+# cache of rendered pages, invalidated by the views that write
+cache = ResponseCache()
+
+# per-endpoint request metrics served at /metrics
+metrics = RequestMetrics()
+
+# logs the statements a request runs over and over, in development
+nplusone = NPlusOneDetector()
+
+# fingerprinted, precompressed static files built by `flask assets build`
+assets = Assets()
+
+# background jobs, such as purging deleted venues and artists
+jobs = JobQueue()
+
+# template bytecode cache and cached per-entity fragments of pages
+templates = Templates()
+
+
+def create_app(test_config=None):
+    """Create and configure the WSGI application object.
+
+    test_config, when given, replaces the instance and APP_CONFIG_FILE
+    configuration so tests don't need either to exist.
+    """
+    # ----------------------------------------------------------------------------#
+    #  App Config.
+    # ----------------------------------------------------------------------------#
+    app = Flask(__name__, instance_relative_config=True)
+    # load the default configuration in config/default.py
+    app.config.from_object('config.default')
+    if test_config is None:
+        # loads configuration from instance/config.py
+        app.config.from_pyfile('config.py')
+        # APP_CONFIG_FILE should be the absolute path to env specific configuration
+        app.config.from_envvar('APP_CONFIG_FILE')
+    else:
+        app.config.from_mapping(test_config)
+
+    # timestamps are read in UTC, as asyncpg always returns them, so the async
+    # mode renders the same times and fragment keys as the Flask app
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {}).setdefault("connect_args", {})\
+        .setdefault("options", "-c timezone=UTC")
+    # before db so pool checkouts are timed from the first connection
+    metrics.init_app(app)
+    db.init_app(app)
+    replicas.init_app(app)
+    migrate.init_app(app, db)
+    moment.init_app(app)
+    cache.init_app(app)
+    assets.init_app(app)
+    jobs.init_app(app)
+    nplusone.init_app(app)
+    templates.init_app(app)
 
-# circular import generally a bad idea; ok here since these not actually used
-import fyyur.views
+    # imported here rather than at module level to avoid circular imports
+    from fyyur.api import api
+    from fyyur.commands import commands
+    from fyyur.views import bp
+    app.register_blueprint(bp)
+    app.register_blueprint(api)
+    for command in commands:
+        app.cli.add_command(command)
+    return app
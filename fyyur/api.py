@@ -0,0 +1,178 @@
+"""
+Read-only JSON API for venues, artists and shows, mounted at /api/v1.
+Every endpoint takes fields= to select the attributes returned, listings
+are paginated with a keyset cursor and bodies are compact JSON. Entities
+carry a strong ETag derived from their modification time, which is checked
+before the entity is loaded so unchanged resources cost one indexed lookup.
+----------------------------------------------------------------------------#
+ API.
+----------------------------------------------------------------------------#
+"""
+import json
+from datetime import datetime
+
+from flask import Blueprint, abort, current_app, jsonify, request, url_for
+
+from fyyur import replicas
+from fyyur.bulk import json_default
+from fyyur.conditional import make_etag, not_modified, set_validators
+from fyyur.models import Artist, Venue
+from fyyur.queries import (SHOW_COLUMNS, entities_page, entity_fields, entity_version,
+                           search_names, show_fields_page)
+from fyyur.views import list_cursor_args, search_page_args
+
+API_VERSION = 'v1'
+
+# registered on the app by create_app()
+api = Blueprint('api', __name__, url_prefix='/api/' + API_VERSION)
+
+# attributes that can be requested with fields=, in their default order; deleted
+# entities are not served, so deleted_at is always empty
+ENTITY_FIELDS = {
+    model: tuple(column.name for column in model.__table__.columns if column.name != 'deleted_at')
+    for model in (Venue, Artist)
+}
+SHOW_FIELDS = tuple(SHOW_COLUMNS)
+
+# ----------------------------------------------------------------------------#
+#  Helpers.
+# ----------------------------------------------------------------------------#
+
+
+def json_response(data):
+    """Serialize data without whitespace; datetimes are written as ISO 8601."""
+    return current_app.response_class(
+        json.dumps(data, separators=(',', ':'), default=json_default),
+        mimetype='application/json')
+
+
+def fields_arg(allowed):
+    """Read the comma separated fields= argument; all allowed fields by default."""
+    fields = request.args.get('fields')
+    if not fields:
+        return allowed
+    fields = tuple(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        abort(400, "unknown fields: {}; choose from {}".format(", ".join(unknown),
+                                                               ", ".join(allowed)))
+    return fields
+
+
+def limit_arg():
+    limit = request.args.get('limit', current_app.config["LIST_PAGE_LIMIT"], type=int)
+    return min(max(limit, 1), current_app.config["API_PAGE_MAX_LIMIT"])
+
+
+def cursor_args(next_after):
+    """Return the after= argument of the page following the cursor next_after, if any."""
+    if next_after is None:
+        return None
+    return {'after': '|'.join(value.isoformat() if isinstance(value, datetime) else str(value)
+                              for value in next_after)}
+
+
+def page_response(data, next_args, **extra):
+    """Return a page of a listing with the extra top level members; its ETag hashes the body.
+
+    next_args are the arguments that change for the next page, None on the last page.
+    """
+    next_url = None
+    if next_args is not None:
+        next_url = url_for(request.endpoint, **dict(request.args.to_dict(), **next_args))
+    response = json_response(dict(extra, data=data, next=next_url))
+    response.add_etag()
+    # clients may keep the page but must revalidate it before use
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def entity_response(model, entity_id):
+    """Return the requested fields of one entity, or 304 if the client's copy is current.
+
+    The validator query reads the modification time and show counts only, so
+    a 304 is answered without loading the entity.
+    """
+    fields = fields_arg(ENTITY_FIELDS[model])
+    version = entity_version(model, entity_id)
+    if version is None:
+        abort(404)
+    last_modified = version[0]
+    etag = make_etag(API_VERSION, model.__tablename__, entity_id, *version, ','.join(fields))
+    response = not_modified(etag, last_modified)
+    if response is None:
+        data = entity_fields(model, entity_id, fields)
+        # deleted since the validator query
+        if data is None:
+            abort(404)
+        response = set_validators(json_response(data), etag, last_modified)
+    response.cache_control.no_cache = True
+    return response
+
+
+def _search_response(model):
+    page, limit = search_page_args()
+    results = search_names(model, request.args.get('q', ''), page, limit)
+    next_args = {'page': page + 1} if results.pop("more") else None
+    return page_response(results.pop("data"), next_args, **results)
+
+
+# ----------------------------------------------------------------------------#
+#  Resources.
+# ----------------------------------------------------------------------------#
+
+
+@api.route('/venues')
+@replicas.reads
+def venues():
+    data, next_after = entities_page(Venue, fields_arg(ENTITY_FIELDS[Venue]),
+                                     list_cursor_args(int), limit_arg())
+    return page_response(data, cursor_args(next_after))
+
+
+@api.route('/venues/<int:venue_id>')
+@replicas.reads
+def venue(venue_id):
+    return entity_response(Venue, venue_id)
+
+
+@api.route('/venues/search')
+@replicas.reads
+def search_venues():
+    return _search_response(Venue)
+
+
+@api.route('/artists')
+@replicas.reads
+def artists():
+    data, next_after = entities_page(Artist, fields_arg(ENTITY_FIELDS[Artist]),
+                                     list_cursor_args(int), limit_arg())
+    return page_response(data, cursor_args(next_after))
+
+
+@api.route('/artists/<int:artist_id>')
+@replicas.reads
+def artist(artist_id):
+    return entity_response(Artist, artist_id)
+
+
+@api.route('/artists/search')
+@replicas.reads
+def search_artists():
+    return _search_response(Artist)
+
+
+@api.route('/shows')
+@replicas.reads
+def shows():
+    data, next_after = show_fields_page(fields_arg(SHOW_FIELDS),
+                                        list_cursor_args(datetime.fromisoformat, int), limit_arg())
+    return page_response(data, cursor_args(next_after))
+
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+def api_error(error):
+    response = jsonify(error=error.description)
+    response.status_code = error.code
+    return response
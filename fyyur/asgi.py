@@ -0,0 +1,313 @@
+"""
+Async serving mode, for ASGI servers:
+
+    uvicorn fyyur.asgi:app --workers 4
+
+The read-heavy pages (venue and artist lists and details, shows and the
+searches) run on the event loop: their query plans from fyyur.queries are
+compiled by SQLAlchemy and executed on an asyncpg pool, so a request waiting
+on Postgres holds no thread. Everything else, and every request carrying a
+session cookie (whose pages may show flashed messages), goes to the Flask
+app on a bounded pool of threads, exactly as under a WSGI server.
+
+Pages served on the event loop skip the response cache, whose server proxy
+blocks, and the before/after request hooks such as the metrics.
+----------------------------------------------------------------------------#
+ ASGI.
+----------------------------------------------------------------------------#
+"""
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit
+
+import asyncpg
+import pytz
+from a2wsgi import WSGIMiddleware
+from flask import current_app, make_response, render_template, request
+from sqlalchemy.dialects import postgresql
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_cookie
+from werkzeug.routing import Map, Rule
+
+from fyyur import create_app
+from fyyur.conditional import cache_publicly, not_modified, set_validators
+from fyyur.models import Artist, Venue
+from fyyur.queries import (artist_shows_plan, artist_version_plan, artists_page_plan,
+                           entity_plan, search_names_plan, shows_page_plan, venue_areas_plan,
+                           venue_shows_plan, venue_version_plan)
+from fyyur.views import (detail_validators, list_cursor_args, next_page_url, search_page_args)
+
+# numbered bind parameters, rewritten from :n to asyncpg's $n
+DIALECT = postgresql.dialect(paramstyle='numeric')
+# as detected on connect by the engine's dialect: backslashes in string
+# literals are literal, the default since PostgreSQL 9.1
+DIALECT._backslash_escapes = False
+NUMERIC_PARAM = re.compile(r"(?<![:\w]):(\d+)")
+
+# the routes served on the event loop; endpoints are the names of handlers below
+ROUTES = Map([
+    Rule('/venues', endpoint='venues', methods=['GET']),
+    Rule('/venues/<int:venue_id>', endpoint='show_venue', methods=['GET']),
+    Rule('/venues/search', endpoint='search_venues', methods=['POST']),
+    Rule('/artists', endpoint='artists', methods=['GET']),
+    Rule('/artists/<int:artist_id>', endpoint='show_artist', methods=['GET']),
+    Rule('/artists/search', endpoint='search_artists', methods=['POST']),
+    Rule('/shows', endpoint='shows', methods=['GET']),
+])
+
+
+class Delegate(Exception):
+    """Raised by a handler to have the request served by the Flask app instead."""
+
+
+def compile_query(query):
+    """Return the SQL of a SQLAlchemy query in asyncpg's $n style and its parameters."""
+    compiled = query.statement.compile(dialect=DIALECT)
+    params = compiled.construct_params()
+    return (NUMERIC_PARAM.sub(r"$\1", compiled.string),
+            [params[name] for name in compiled.positiontup])
+
+
+async def _receive_body(receive):
+    body = []
+    while True:
+        message = await receive()
+        body.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(body)
+
+
+class AsyncRequest(object):
+    """One request served on the event loop.
+
+    execute() runs a query plan on the pool; context() pushes a Flask
+    request context for the synchronous parts, which must not await, and
+    render() renders a page on one of the rendering threads, so long pages
+    don't hold up the event loop.
+    """
+
+    def __init__(self, app, scope, body):
+        self.app = app
+        self.scope = scope
+        self.body = body
+
+    async def execute(self, plan):
+        rows = None
+        while True:
+            try:
+                query = plan.send(rows)
+            except StopIteration as stop:
+                return stop.value
+            sql, params = compile_query(query)
+            async with self.app.pool.acquire() as connection:
+                rows = [tuple(record) for record in await connection.fetch(sql, *params)]
+
+    def context(self):
+        headers = [(name.decode('latin-1'), value.decode('latin-1'))
+                   for name, value in self.scope['headers']]
+        return self.app.flask_app.test_request_context(
+            self.scope['path'], method=self.scope['method'],
+            query_string=self.scope['query_string'], headers=headers, data=self.body)
+
+    def _render(self, template, status, context):
+        with self.context():
+            return make_response(render_template(template, **context), status)
+
+    async def render(self, template, status=200, **context):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.app.renderers, self._render, template, status, context)
+
+
+# ----------------------------------------------------------------------------#
+#  Handlers.
+# ----------------------------------------------------------------------------#
+
+
+async def venues(req):
+    areas = await req.execute(venue_areas_plan())
+    return await req.render('pages/venues.html', areas=areas)
+
+
+async def _detail(req, model, entity_id, version_plan, shows_plan, template):
+    kind = model.__tablename__
+    # one reference time for the whole request
+    now = datetime.now(pytz.utc)
+    version = await req.execute(version_plan(entity_id, now))
+    with req.context():
+        validators = detail_validators(kind, entity_id, version, now)
+        if validators is not None:
+            etag, last_modified, s_maxage = validators
+            response = not_modified(etag, last_modified)
+        limit = current_app.config["DETAIL_SHOWS_LIMIT"]
+    if validators is None:
+        return await req.render('errors/404.html', 404)
+    if response is None:
+        data = await req.execute(entity_plan(model, entity_id))
+        if data is None:
+            raise Delegate()
+        data.update(await req.execute(shows_plan(entity_id, now, limit)))
+        response = set_validators(await req.render(template, **{kind: data}), etag, last_modified)
+    return cache_publicly(response, s_maxage)
+
+
+async def show_venue(req, venue_id):
+    return await _detail(req, Venue, venue_id, venue_version_plan, venue_shows_plan,
+                         'pages/show_venue.html')
+
+
+async def show_artist(req, artist_id):
+    return await _detail(req, Artist, artist_id, artist_version_plan, artist_shows_plan,
+                         'pages/show_artist.html')
+
+
+async def _search(req, model, template):
+    with req.context():
+        search_term = request.form.get('search_term', '')
+        page, limit = search_page_args()
+    results = await req.execute(search_names_plan(model, search_term, page, limit))
+    return await req.render(template, results=results, search_term=search_term)
+
+
+async def search_venues(req):
+    return await _search(req, Venue, 'pages/search_venues.html')
+
+
+async def search_artists(req):
+    return await _search(req, Artist, 'pages/search_artists.html')
+
+
+async def _listing(req, page_plan, parsers, template, name, endpoint):
+    with req.context():
+        # streamed listings read from a server-side cursor on the session
+        if request.args.get('stream', type=int):
+            raise Delegate()
+        after = list_cursor_args(*parsers)
+        limit = current_app.config["LIST_PAGE_LIMIT"]
+    data, next_after = await req.execute(page_plan(after, limit))
+    with req.context():
+        next_url = next_page_url(endpoint, next_after)
+    return await req.render(template, next_url=next_url, **{name: data})
+
+
+async def artists(req):
+    return await _listing(req, artists_page_plan, (int, ), 'pages/artists.html', 'artists',
+                          'main.artists')
+
+
+async def shows(req):
+    return await _listing(req, shows_page_plan, (datetime.fromisoformat, int),
+                          'pages/shows.html', 'shows', 'main.shows')
+
+
+HANDLERS = {
+    'venues': venues, 'show_venue': show_venue, 'search_venues': search_venues,
+    'artists': artists, 'show_artist': show_artist, 'search_artists': search_artists,
+    'shows': shows,
+}
+
+# ----------------------------------------------------------------------------#
+#  Application.
+# ----------------------------------------------------------------------------#
+
+
+class AsyncApp(object):
+    """ASGI application serving the read routes on asyncpg and the rest with Flask.
+
+    ASYNC_POOL_SIZE bounds the asyncpg connections, ASYNC_RENDER_THREADS the
+    threads rendering their pages and ASYNC_WSGI_THREADS the threads running
+    requests delegated to Flask. With ASYNC_ROUTES_ENABLED
+    off every request is delegated, as a baseline to compare the two with.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.async_routes = flask_app.config["ASYNC_ROUTES_ENABLED"]
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config["ASYNC_WSGI_THREADS"])
+        self.routes = ROUTES.bind('localhost')
+        self.session_cookie = flask_app.session_cookie_name
+        self.pool = None
+        # creating the pool, shared by the requests arriving while it connects
+        self._connecting = None
+        self.renderers = ThreadPoolExecutor(flask_app.config["ASYNC_RENDER_THREADS"])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http' or not self.async_routes:
+            return await self.delegate(scope, receive, send)
+        cookies = parse_cookie(dict(scope['headers']).get(b'cookie', b'').decode('latin-1'))
+        try:
+            endpoint, args = self.routes.match(scope['path'], scope['method'])
+        except HTTPException:
+            return await self.delegate(scope, receive, send)
+        # the page may show messages flashed into the session
+        if self.session_cookie in cookies:
+            return await self.delegate(scope, receive, send)
+        body = await _receive_body(receive)
+        try:
+            await self.connect()
+            response = await HANDLERS[endpoint](AsyncRequest(self, scope, body), **args)
+        except (Delegate, HTTPException):
+            return await self.delegate(scope, self._replay(body, receive), send)
+        await send({
+            'type': 'http.response.start', 'status': response.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in response.headers.to_wsgi_list()]
+        })
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+
+    @staticmethod
+    def _replay(body, receive):
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            return await receive()
+
+        return replay
+
+    async def delegate(self, scope, receive, send):
+        """Serve a request with the Flask app on one of the WSGI threads."""
+        await self.wsgi(scope, receive, send)
+
+    async def connect(self):
+        if self._connecting is None:
+            # statements are not kept prepared: after a few runs Postgres would plan them
+            # generically, ignoring e.g. the reference time of the show queries
+            self._connecting = asyncio.ensure_future(asyncpg.create_pool(
+                _asyncpg_dsn(self.flask_app.config["SQLALCHEMY_DATABASE_URI"]),
+                min_size=1, max_size=self.flask_app.config["ASYNC_POOL_SIZE"],
+                statement_cache_size=0, server_settings={'timezone': 'UTC'}))
+        self.pool = await self._connecting
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.async_routes:
+                    await self.connect()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.pool is not None:
+                    await self.pool.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def _asyncpg_dsn(uri):
+    """Drop the SQLAlchemy driver name, e.g. postgresql+psycopg2://, from a database URI."""
+    parts = urlsplit(uri)
+    return urlunsplit(parts._replace(scheme=parts.scheme.split('+')[0]))
+
+
+def create_asgi_app(test_config=None):
+    """Create the ASGI application around a Flask app made by create_app()."""
+    return AsyncApp(create_app(test_config))
+
+
+app = create_asgi_app()
@@ -0,0 +1,223 @@
+"""
+Static asset pipeline.
+`flask assets build` concatenates and minifies the stylesheets and scripts
+of each bundle and copies every other static file, writing them all to
+static/dist under content hashed names with gzip and, when the brotli
+package is installed, brotli variants next to them. A manifest maps the
+original names to the hashed ones; url_for('static', ...) is rewritten with
+it and /static/dist serves the precompressed files with immutable caching.
+Without a build the original files are served as before.
+----------------------------------------------------------------------------#
+ Assets.
+----------------------------------------------------------------------------#
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import current_app, request, safe_join, send_file, url_for
+from werkzeug.exceptions import NotFound
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# bundle name -> source files relative to the static folder, in load order
+BUNDLES = {
+    "site.css": ["css/bootstrap.min.css", "css/layout.main.css", "css/main.css",
+                 "css/main.responsive.css", "css/main.quickfix.css"],
+    # loaded synchronously in <head>
+    "head.js": ["js/libs/modernizr-2.8.2.min.js", "js/libs/moment.min.js"],
+    # deferred, after jQuery
+    "site.js": ["js/script.js", "js/libs/bootstrap-3.1.1.min.js", "js/plugins.js"],
+}
+DIST_FOLDER = "dist"
+MANIFEST = "manifest.json"
+# files compressed ahead of time; images and fonts other than svg are compressed already
+COMPRESSED_TYPES = {".css", ".js", ".svg", ".map", ".json", ".txt", ".html", ".ttf", ".otf",
+                    ".eot"}
+# (Accept-Encoding token, file suffix) in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# a year, the longest max-age caches are expected to honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+SOURCE_MAP = re.compile(r"^\s*//[#@] sourceMappingURL=.*$", re.M)
+
+# ----------------------------------------------------------------------------#
+#  Build.
+# ----------------------------------------------------------------------------#
+
+
+def minify_css(css):
+    """Strip comments and insignificant whitespace; uses rcssmin when installed."""
+    if rcssmin is not None:
+        return rcssmin.cssmin(css)
+    css = CSS_COMMENT.sub("", css)
+    css = re.sub(r"\s+", " ", css)
+    # not around ':', where "a :hover" and "a:hover" are different selectors
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def minify_js(js):
+    """Minify with rjsmin when installed; the sources are mostly minified already."""
+    return rjsmin.jsmin(js) if rjsmin is not None else js.strip()
+
+
+def _hashed_name(name, content):
+    root, ext = posixpath.splitext(name)
+    return "{}.{}{}".format(root, hashlib.sha256(content).hexdigest()[:12], ext)
+
+
+def _write(dist, name, content):
+    """Write content to dist/name along with its precompressed variants."""
+    path = os.path.join(dist, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    if posixpath.splitext(name)[1].lower() in COMPRESSED_TYPES:
+        with open(path + ".gz", "wb") as f:
+            f.write(gzip.compress(content, 9))
+        if brotli is not None:
+            with open(path + ".br", "wb") as f:
+                f.write(brotli.compress(content))
+
+
+def _rewrite_css_urls(css, source, manifest, url_path):
+    """Point the relative url()s of the stylesheet at source to absolute, hashed where built."""
+    def rewrite(match):
+        url = match.group(2)
+        if re.match(r"^([a-z]+:|/|#)", url, re.I):
+            return match.group(0)
+        path, suffix = re.match(r"([^?#]*)(.*)$", url).groups()
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+        target = manifest.get(target, target)
+        return 'url("{}/{}{}")'.format(url_path, target, suffix)
+
+    return CSS_URL.sub(rewrite, css)
+
+
+def build(static_folder, url_path):
+    """Rebuild static/dist and its manifest; return the manifest.
+
+    Files other than stylesheets are fingerprinted first so that stylesheets,
+    whose url()s are rewritten, can refer to their hashed names.
+    """
+    dist = os.path.join(static_folder, DIST_FOLDER)
+    shutil.rmtree(dist, ignore_errors=True)
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [name for name in dirs if os.path.join(root, name) != dist]
+        for name in files:
+            if not name.startswith("."):
+                sources.append(os.path.relpath(os.path.join(root, name),
+                                               static_folder).replace(os.sep, "/"))
+    # original name -> name relative to the static folder of the hashed copy
+    manifest = {}
+    for source in sorted(sources, key=lambda source: source.endswith(".css")):
+        with open(os.path.join(static_folder, source), "rb") as f:
+            content = f.read()
+        if source.endswith(".css"):
+            content = _rewrite_css_urls(content.decode("utf-8"), source, manifest,
+                                        url_path).encode("utf-8")
+        hashed = _hashed_name(source, content)
+        _write(dist, hashed, content)
+        manifest[source] = posixpath.join(DIST_FOLDER, hashed)
+
+    for bundle, files in BUNDLES.items():
+        parts = []
+        for source in files:
+            with open(os.path.join(static_folder, source), encoding="utf-8") as f:
+                content = f.read()
+            if bundle.endswith(".css"):
+                parts.append(minify_css(_rewrite_css_urls(content, source, manifest, url_path)))
+            else:
+                # source maps of the parts don't apply to the bundle
+                parts.append(minify_js(SOURCE_MAP.sub("", content)))
+        # a part without a trailing semicolon must not run into the next one
+        content = ("\n" if bundle.endswith(".css") else "\n;\n").join(parts).encode("utf-8")
+        hashed = _hashed_name(bundle, content)
+        _write(dist, hashed, content)
+        manifest[bundle] = posixpath.join(DIST_FOLDER, hashed)
+
+    with open(os.path.join(dist, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+# ----------------------------------------------------------------------------#
+#  Runtime.
+# ----------------------------------------------------------------------------#
+
+
+class Assets(object):
+    """Serves the built assets and points url_for('static', ...) at them.
+
+    The manifest is read once when the app is created; with ASSETS_ENABLED
+    off, or before the first build, the original static files are used.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        manifest = {}
+        path = os.path.join(app.static_folder, DIST_FOLDER, MANIFEST)
+        if app.config["ASSETS_ENABLED"] and os.path.exists(path):
+            with open(path) as f:
+                manifest = json.load(f)
+        app.extensions["assets"] = {"manifest": manifest}
+        app.url_defaults(self._fingerprint)
+        # more specific than the static rule, so it takes the built files
+        app.add_url_rule(app.static_url_path + "/" + DIST_FOLDER + "/<path:filename>",
+                         "assets_dist", self.send_built)
+        app.add_template_global(self.asset_urls)
+
+    def _fingerprint(self, endpoint, values):
+        if endpoint == "static" and "filename" in values:
+            manifest = current_app.extensions["assets"]["manifest"]
+            values["filename"] = manifest.get(values["filename"], values["filename"])
+
+    def asset_urls(self, bundle):
+        """Return the URLs to load bundle from: the built bundle, or else each of its files."""
+        if bundle in current_app.extensions["assets"]["manifest"]:
+            return [url_for("static", filename=bundle)]
+        return [url_for("static", filename=source) for source in BUNDLES[bundle]]
+
+    def send_built(self, filename):
+        """Send a built file, precompressed if the client accepts it, to be cached forever."""
+        dist = os.path.join(current_app.static_folder, DIST_FOLDER)
+        path = safe_join(dist, filename)
+        if not os.path.isfile(path):
+            raise NotFound()
+        encoding = None
+        for token, suffix in ENCODINGS:
+            if token in request.accept_encodings and os.path.isfile(path + suffix):
+                encoding, path = token, path + suffix
+                break
+        response = send_file(path, mimetype=mimetypes.guess_type(filename)[0],
+                             conditional=True, cache_timeout=IMMUTABLE_MAX_AGE)
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        # built names change with their content, so a copy never needs revalidating
+        response.headers["Cache-Control"] = "public, max-age={}, immutable".format(
+            IMMUTABLE_MAX_AGE)
+        return response
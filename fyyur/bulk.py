@@ -0,0 +1,189 @@
+"""
+Bulk loading and dumping of venues, artists and shows as CSV or NDJSON.
+Rows are read lazily and written with COPY in fixed size batches, and dumps
+are read from a server-side cursor, so memory stays bounded by the batch
+size whatever the size of the file or table.
+----------------------------------------------------------------------------#
+ Bulk import and export.
+----------------------------------------------------------------------------#
+"""
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from itertools import islice
+
+from fyyur import db
+from fyyur.models import Artist, Show, Venue
+from fyyur.queries import live
+
+MODELS = {"venues": Venue, "artists": Artist, "shows": Show}
+# timestamps and show counters are maintained by the database and never loaded from files
+SKIPPED_COLUMNS = {
+    "time_created", "time_updated", "is_upcoming", "upcoming_shows_count", "past_shows_count",
+    "shows_changed_at", "deleted_at"
+}
+
+
+def model_columns(model):
+    """Return the names of the columns of model that can be loaded from a file."""
+    return [column.name for column in model.__table__.columns if column.name not in SKIPPED_COLUMNS]
+
+
+def read_rows(path, fmt):
+    """Yield the rows of a CSV or NDJSON file as dicts, one at a time."""
+    with open(path, newline='') as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                yield row
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _pg_array(values):
+    """Format a list as a Postgres array literal."""
+    return "{" + ",".join('"{}"'.format(value.replace("\\", "\\\\").replace('"', '\\"'))
+                          for value in values) + "}"
+
+
+def _copy_value(value):
+    # None and empty strings are both written as NULL by COPY ... CSV
+    if isinstance(value, list):
+        return _pg_array(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def _copy_batch(cursor, table, columns, rows):
+    """COPY a batch of row dicts into table."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(row.get(column)) for column in columns])
+    buffer.seek(0)
+    cursor.copy_expert('COPY "{}" ({}) FROM STDIN WITH (FORMAT csv)'.format(
+        table, ", ".join(columns)), buffer)
+
+
+def _reseed_id(cursor, table):
+    # rows may carry explicit ids; move the identity sequence past them
+    cursor.execute("SELECT setval(pg_get_serial_sequence('\"{0}\"', 'id'), "
+                   "COALESCE(MAX(id), 0) + 1, false) FROM \"{0}\"".format(table))
+
+
+def import_rows(model, rows, batch_size):
+    """Load rows into the table of model, committing once per batch.
+
+    Yields (loaded, skipped) running totals after every batch. Shows are
+    first copied into a temporary staging table and only inserted when both
+    the venue and the artist they reference exist and are not deleted; the
+    rest are skipped.
+    """
+    table = model.__tablename__
+    rows = iter(rows)
+    first_batch = list(islice(rows, batch_size))
+    if not first_batch:
+        return
+    # load the columns present in the file, in table order
+    columns = [column for column in model_columns(model) if column in first_batch[0]]
+    loaded = skipped = 0
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if model is Show:
+            # same columns as show but no constraints, so any row can be staged
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS show_import ON COMMIT DELETE ROWS "
+                           "AS SELECT * FROM show WITH NO DATA")
+        batch = first_batch
+        while batch:
+            if model is Show:
+                _copy_batch(cursor, "show_import", columns, batch)
+                # resolve the foreign keys in the database rather than failing the batch
+                cursor.execute(
+                    "INSERT INTO show ({0}) SELECT {1} FROM show_import s "
+                    "JOIN venue v ON v.id = s.venue_id AND v.deleted_at IS NULL "
+                    "JOIN artist a ON a.id = s.artist_id AND a.deleted_at IS NULL".format(
+                        ", ".join(columns), ", ".join("s." + column for column in columns)))
+                loaded += cursor.rowcount
+                skipped += len(batch) - cursor.rowcount
+            else:
+                _copy_batch(cursor, table, columns, batch)
+                loaded += len(batch)
+            connection.commit()
+            yield loaded, skipped
+            batch = list(islice(rows, batch_size))
+        if "id" in columns:
+            _reseed_id(cursor, table)
+            connection.commit()
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+def timed_import(model, rows, batch_size, report):
+    """Run import_rows, calling report with the running totals and throughput."""
+    start = time.perf_counter()
+    loaded = skipped = 0
+    for loaded, skipped in import_rows(model, rows, batch_size):
+        elapsed = time.perf_counter() - start
+        report(loaded, skipped, elapsed)
+    return loaded, skipped, time.perf_counter() - start
+
+
+def _csv_value(value):
+    # inverse of _copy_value so a CSV dump can be imported again
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return _copy_value(value)
+
+
+def json_default(value):
+    """Serialize the values json does not know; datetimes are written as ISO 8601."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError("{!r} is not JSON serializable".format(value))
+
+
+def iter_export(model, fmt, batch_size):
+    """Yield a CSV or NDJSON dump of the table of model in chunks of text.
+
+    Rows come from a server-side cursor batch_size at a time and each batch is
+    serialized into one chunk. Deleted venues and artists and their shows are
+    left out. Genres are written as lists in NDJSON and as
+    Postgres array literals in CSV, and timestamps as ISO 8601 with their UTC
+    offset, which is what import_rows reads back.
+    """
+    columns = list(model.__table__.columns)
+    names = [column.name for column in columns]
+    rows = db.session.query(*columns)
+    if model is Show:
+        rows = rows.join(Venue, Venue.id == Show.venue_id)\
+            .join(Artist, Artist.id == Show.artist_id)\
+            .filter(live(Venue), live(Artist))
+    else:
+        rows = rows.filter(live(model))
+    rows = rows\
+        .order_by(model.id)\
+        .execution_options(stream_results=True)\
+        .yield_per(batch_size)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(names)
+    for count, row in enumerate(rows, 1):
+        if fmt == "csv":
+            writer.writerow([_csv_value(value) for value in row])
+        else:
+            buffer.write(json.dumps(dict(zip(names, row)), default=json_default,
+                                    separators=(",", ":")))
+            buffer.write("\n")
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,267 @@
+"""
+Response cache for the read-heavy pages.
+Rendered pages are kept in a size bounded LRU with a TTL per entry and are
+tagged with the entities they show, so the views that write can invalidate
+exactly the pages they affect. A page rendered while one of its tags was
+invalidated is not stored, since it may have been read before the write.
+The LRU lives in-process by default or in a standalone cache server (`flask
+cache-server`) shared by all the workers. An in-process cache only sees the
+invalidations of its own worker, so run the cache server whenever the app
+runs in more than one process; otherwise the other workers serve their
+copies of a changed page until its TTL runs out.
+----------------------------------------------------------------------------#
+ Cache.
+----------------------------------------------------------------------------#
+"""
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from multiprocessing.managers import BaseManager
+from threading import Lock
+
+from flask import Response, current_app, g, make_response, request, session
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache(object):
+    """Size bounded least recently used cache with a TTL and tags per entry.
+
+    The time each tag was last invalidated is remembered for as many tags as
+    there are entries, so set() can refuse values computed before one of
+    their tags was invalidated.
+    """
+
+    def __init__(self, max_entries=1024, default_ttl=60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        # key -> (expires_at, value, tags), least recently used first
+        self._entries = OrderedDict()
+        # tag -> keys of the entries carrying it
+        self._tagged = defaultdict(set)
+        # tag -> time of its last invalidation, least recently invalidated first
+        self._invalidated = OrderedDict()
+        # latest invalidation time dropped from _invalidated
+        self._forgotten = 0
+        self._lock = Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = self.stale_sets = 0
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            self._tagged[tag].discard(key)
+            if not self._tagged[tag]:
+                del self._tagged[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def clock(self):
+        """Return the current time of the cache, to pass to set() as since."""
+        return time.time()
+
+    def _stale(self, tags, since):
+        if since <= self._forgotten:
+            return True
+        return any(self._invalidated.get(tag, 0) >= since for tag in tags)
+
+    def set(self, key, value, ttl=None, tags=(), since=None):
+        """Store value under key, tagged with tags.
+
+        since is what clock() returned before value was computed; the value is
+        dropped if one of its tags has been invalidated since then.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            if since is not None and self._stale(tags, since):
+                self.stale_sets += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + ttl, value, tuple(tags))
+            for tag in tags:
+                self._tagged[tag].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of tags."""
+        with self._lock:
+            now = time.time()
+            for tag in tags:
+                for key in list(self._tagged.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+                self._invalidated.pop(tag, None)
+                self._invalidated[tag] = now
+            while len(self._invalidated) > self.max_entries:
+                _, self._forgotten = self._invalidated.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions,
+                "invalidations": self.invalidations, "stale_sets": self.stale_sets
+            }
+
+
+class _ServerManager(BaseManager):
+    pass
+
+
+class _ClientManager(BaseManager):
+    pass
+
+
+_ClientManager.register('get_cache')
+
+
+def serve(address, authkey, max_entries, default_ttl):
+    """Serve one LRUCache to other processes until interrupted."""
+    cache = LRUCache(max_entries, default_ttl)
+    _ServerManager.register('get_cache', callable=lambda: cache)
+    manager = _ServerManager(address=address, authkey=authkey)
+    manager.get_server().serve_forever()
+
+
+def connect(address, authkey):
+    """Return a proxy to the LRUCache served at address; it has the same methods."""
+    manager = _ClientManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager.get_cache()
+
+
+class ResponseCache(object):
+    """Caches the responses of GET views in the backend chosen by the app config.
+
+    RESPONSE_CACHE_SERVER is the (host, port) of a cache server, or None to
+    keep the cache in-process. If the server cannot be reached pages are
+    simply rendered uncached.
+    """
+
+    def __init__(self, app=None):
+        self._lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # the backend is created on first use, so apps can be built without a server
+        app.extensions['response_cache'] = {'backend': None}
+
+    @property
+    def backend(self):
+        state = current_app.extensions['response_cache']
+        if state['backend'] is None:
+            with self._lock:
+                if state['backend'] is None:
+                    config = current_app.config
+                    if config["RESPONSE_CACHE_SERVER"]:
+                        state['backend'] = connect(tuple(config["RESPONSE_CACHE_SERVER"]),
+                                                   config["RESPONSE_CACHE_AUTHKEY"].encode())
+                    else:
+                        state['backend'] = LRUCache(config["RESPONSE_CACHE_MAX_ENTRIES"],
+                                                    config["RESPONSE_CACHE_TTL"])
+        return state['backend']
+
+    def _call(self, method, *args):
+        try:
+            return getattr(self.backend, method)(*args)
+        except (OSError, EOFError) as e:
+            # a cache server that went away must not take the pages down with it
+            logger.warning("response cache unavailable: %s", e)
+            current_app.extensions['response_cache']['backend'] = None
+            return None
+
+    def invalidate(self, *tags):
+        self._call("invalidate", *tags)
+
+    def stats(self):
+        return self._call("stats") or {}
+
+    def _current_since(self, since):
+        """Return the time what the request has read is current as of, given its start since.
+
+        Reads from a replica may lag the writes, and so the invalidations, by up
+        to REPLICA_READ_YOUR_WRITES_SECONDS; values computed from one are not
+        cached while one of their tags was invalidated within that window.
+        """
+        if since is not None and g.get("db_replica") is not None:
+            since -= current_app.config["REPLICA_READ_YOUR_WRITES_SECONDS"]
+        return since
+
+    def memoize(self, key, compute, *tags):
+        """Return the value cached under key, or compute() it and cache it under tags.
+
+        For aggregates several pages share; values must pickle to be kept by a
+        cache server and None is never cached.
+        """
+        key = "value:" + key
+        value = self._call("get", key)
+        if value is None:
+            since = self._call("clock")
+            value = compute()
+            self._call("set", key, value, None, tags, self._current_since(since))
+        return value
+
+    def tag(self, *tags):
+        """Add tags to the page being rendered, e.g. the entities it lists."""
+        g.setdefault("cache_tags", set()).update(tags)
+
+    def expire_at(self, when):
+        """Expire the page being rendered no later than the aware datetime when."""
+        if when is not None:
+            ttl = max(int(when.timestamp() - time.time()), 0)
+            g.cache_ttl = min(g.get("cache_ttl", ttl), ttl)
+
+    def cached(self, *tags):
+        """Cache a GET view by its full path under tags formatted with the view arguments.
+
+        Pages rendered with pending flash messages and streamed responses are
+        not cached. Responses carry an X-Cache header telling whether they hit.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                # flashed messages are rendered into the page and belong to one user
+                if request.method != 'GET' or '_flashes' in session:
+                    return view(**kwargs)
+                key = "page:" + request.full_path
+                entry = self._call("get", key)
+                if entry is not None:
+                    body, status, headers = entry
+                    response = Response(body, status, headers)
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+                # a write invalidating the page while it renders makes it stale
+                since = self._call("clock")
+                response = make_response(view(**kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    page_tags = {tag.format(**kwargs) for tag in tags} | g.get("cache_tags", set())
+                    self._call("set", key,
+                               (response.get_data(), response.status_code, list(response.headers)),
+                               g.get("cache_ttl"), page_tags, self._current_since(since))
+                response.headers["X-Cache"] = "MISS"
+                return response
+
+            return wrapper
+
+        return decorator
@@ -0,0 +1,180 @@
+"""
+Command line interface, available through `flask <command>`.
+create_app() adds every command listed in `commands` to the app.
+----------------------------------------------------------------------------#
+ Commands.
+----------------------------------------------------------------------------#
+"""
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+
+from fyyur import cache
+from fyyur.assets import BUNDLES, build
+from fyyur.bulk import MODELS, iter_export, read_rows, timed_import
+from fyyur.cache import serve
+from fyyur.counters import refresh, rollover
+from fyyur.models import Artist, Venue
+from fyyur.purge import deleted_ids, purge
+from fyyur.templating import compile_templates
+
+
+data = AppGroup("data", help="Bulk import and export of venues, artists and shows.")
+
+
+@data.command("import")
+@click.argument("kind", type=click.Choice(sorted(MODELS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]),
+              help="File format; guessed from the file extension by default.")
+@click.option("--batch-size", default=10000, show_default=True, help="Rows per COPY and commit.")
+def import_data(kind, path, fmt, batch_size):
+    """Load KIND rows from the CSV or NDJSON file at PATH.
+
+    Columns are matched by name to the table columns. Genres are lists in
+    NDJSON and Postgres array literals ({Jazz,Folk}) in CSV. Shows that
+    reference a venue or an artist that does not exist are skipped.
+    """
+    if fmt is None:
+        fmt = "csv" if os.path.splitext(path)[1].lower() == ".csv" else "ndjson"
+
+    def report(loaded, skipped, elapsed):
+        click.echo("{:>12,} rows loaded, {:,} skipped, {:,.0f} rows/s".format(
+            loaded, skipped, loaded / elapsed if elapsed else 0))
+
+    loaded, skipped, elapsed = timed_import(MODELS[kind], read_rows(path, fmt), batch_size, report)
+    # new rows and, for shows, new counters on every listing
+    invalidate_pages('venues', 'artists', 'shows', 'genres')
+    click.echo("Imported {:,} {} in {:.1f}s ({:,} skipped)".format(loaded, kind, elapsed, skipped))
+
+
+@data.command("export")
+@click.argument("kind", type=click.Choice(sorted(MODELS)))
+@click.option("-o", "--output", type=click.File("w"), default="-",
+              help="File to write to; standard output by default.")
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default="ndjson",
+              show_default=True)
+@click.option("--batch-size", default=10000, show_default=True,
+              help="Rows fetched from the database per round trip.")
+def export_data(kind, output, fmt, batch_size):
+    """Dump every KIND row as CSV or NDJSON, in a format `data import` reads back."""
+    for chunk in iter_export(MODELS[kind], fmt, batch_size):
+        output.write(chunk)
+
+
+@click.command("cache-server")
+@click.option("--host", default="localhost", show_default=True)
+@click.option("--port", default=5050, show_default=True)
+@with_appcontext
+def cache_server(host, port):
+    """Run the response cache shared by all workers.
+
+    Point RESPONSE_CACHE_SERVER at (host, port) for the workers to use it.
+    """
+    config = current_app.config
+    click.echo("Serving response cache on {}:{}".format(host, port))
+    serve((host, port), config["RESPONSE_CACHE_AUTHKEY"].encode(),
+          config["RESPONSE_CACHE_MAX_ENTRIES"], config["RESPONSE_CACHE_TTL"])
+
+
+def invalidate_pages(*tags):
+    """Invalidate tags in the response cache shared by the workers, if they use one.
+
+    Workers keeping their own cache can't be reached from here, and serve
+    their pages until these expire.
+    """
+    if current_app.config["RESPONSE_CACHE_SERVER"]:
+        cache.invalidate(*tags)
+
+
+counters = AppGroup("counters", help="Maintenance of the upcoming/past show counters.")
+
+
+@counters.command("rollover")
+@click.option("--every", default=0, show_default=True,
+              help="Keep running and roll over every this many seconds; 0 runs once.")
+def rollover_counters(every):
+    """Move shows that have started from upcoming to past.
+
+    Run it alongside the app with --every 60: pages reading the counters are
+    not cached while a started show waits for it, and show it as upcoming
+    until it has run.
+    """
+    while True:
+        count = rollover()
+        if count:
+            # pages listing upcoming shows are stale now
+            invalidate_pages('shows')
+        click.echo("Rolled over {} shows".format(count))
+        if not every:
+            break
+        time.sleep(every)
+
+
+@counters.command("refresh")
+def refresh_counters():
+    """Recompute every venue and artist counter from the show table."""
+    refresh()
+    invalidate_pages('shows')
+    click.echo("Show counters refreshed")
+
+
+assets = AppGroup("assets", help="Build the fingerprinted static files.")
+
+
+@assets.command("build")
+def build_assets():
+    """Bundle, fingerprint and precompress the static files into static/dist.
+
+    Restart the app afterwards; the manifest is read when it starts.
+    """
+    start = time.perf_counter()
+    manifest = build(current_app.static_folder, current_app.static_url_path)
+    for bundle in BUNDLES:
+        click.echo("{:<10} -> {}".format(bundle, manifest[bundle]))
+    click.echo("Built {} files in {:.1f}s".format(len(manifest), time.perf_counter() - start))
+
+
+jobs = AppGroup("jobs", help="Background work run outside the queue of the workers.")
+
+
+@jobs.command("purge")
+@click.option("--batch-size", type=int,
+              help="Shows deleted per commit; PURGE_BATCH_SIZE by default.")
+def purge_deleted(batch_size):
+    """Purge every deleted venue and artist whose purge job did not finish.
+
+    Purge jobs are lost when the worker that queued them stops; run this
+    after a restart, or regularly, to remove what they left behind.
+    """
+    batch_size = batch_size or current_app.config["PURGE_BATCH_SIZE"]
+    for model in (Venue, Artist):
+        for entity_id in deleted_ids(model):
+            count = purge(model, entity_id, batch_size)
+            click.echo("Purged {} {} and its {:,} shows".format(model.__tablename__, entity_id,
+                                                               count))
+    # the show counters of the other side of their bookings went down with the shows
+    invalidate_pages('shows', 'venues', 'artists')
+
+
+templates = AppGroup("templates", help="Precompilation of the Jinja templates.")
+
+
+@templates.command("compile")
+def compile_all_templates():
+    """Compile every template into the bytecode cache, so workers start without compiling.
+
+    Run at deploy time after the templates change; stale entries are
+    detected by their source checksum and recompiled on first use.
+    """
+    if not current_app.config["TEMPLATE_BYTECODE_CACHE_DIR"]:
+        raise click.ClickException("TEMPLATE_BYTECODE_CACHE_DIR is not set")
+    start = time.perf_counter()
+    names = compile_templates(current_app)
+    click.echo("Compiled {} templates in {:.2f}s".format(len(names), time.perf_counter() - start))
+
+
+commands = [data, cache_server, counters, assets, jobs, templates]
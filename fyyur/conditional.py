@@ -0,0 +1,97 @@
+"""
+Conditional GET support.
+Views compute an entity tag and a modification time from a cheap validator
+query, answer 304 Not Modified when the client's copy is still current and
+only otherwise load and render the resource.
+----------------------------------------------------------------------------#
+ Conditional requests.
+----------------------------------------------------------------------------#
+"""
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import Response, abort, make_response, request, session
+
+
+def make_etag(*parts):
+    """Return a strong entity tag derived from parts, which must identify the representation."""
+    return hashlib.sha1("\0".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def set_validators(response, etag, last_modified=None):
+    """Add the ETag and Last-Modified headers to response."""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
+
+
+def _not_modified_since(last_modified):
+    since = request.if_modified_since
+    if last_modified is None or since is None:
+        return False
+    # HTTP dates have second precision and are compared in UTC
+    last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response if the request's validators match, otherwise None.
+
+    If-None-Match takes precedence over If-Modified-Since and is compared
+    weakly, as RFC 7232 requires for GET and HEAD.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    else:
+        matched = _not_modified_since(last_modified)
+    if not matched:
+        return None
+    return set_validators(Response(status=304), etag, last_modified)
+
+
+def cache_publicly(response, s_maxage):
+    """Let shared caches keep response for s_maxage seconds and browsers revalidate it."""
+    response.cache_control.public = True
+    response.cache_control.max_age = 0
+    response.cache_control.s_maxage = s_maxage
+    return response
+
+
+def conditional(validate):
+    """Answer conditional GETs of a view from validators computed before it runs.
+
+    validate is called with the view arguments and returns (etag,
+    last_modified, s_maxage), or None when the resource does not exist.
+    Shared caches may keep a page for s_maxage seconds while browsers
+    revalidate it on every use. Pages rendered with pending flash messages
+    belong to one user and are never stored.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if '_flashes' in session:
+                response = make_response(view(**kwargs))
+                response.cache_control.private = True
+                response.cache_control.no_store = True
+                return response
+            validators = validate(**kwargs)
+            if validators is None:
+                abort(404)
+            etag, last_modified, s_maxage = validators
+            response = not_modified(etag, last_modified)
+            if response is None:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+                set_validators(response, etag, last_modified)
+            return cache_publicly(response, s_maxage)
+
+        return wrapper
+
+    return decorator
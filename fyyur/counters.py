@@ -0,0 +1,45 @@
+"""
+Maintenance of the denormalized upcoming/past show counters.
+Inserts, updates and deletes of shows keep venue and artist counters current
+through database triggers; the jobs here move shows whose start time has
+passed from upcoming to past and rebuild the counters from scratch.
+Rollover runs as `flask counters rollover --every 60`, never in a request,
+so reads stay read-only; counters lag a started show by up to that period.
+----------------------------------------------------------------------------#
+ Counters.
+----------------------------------------------------------------------------#
+"""
+from sqlalchemy.sql import func
+
+from fyyur import db
+from fyyur.models import Show
+
+
+def rollover():
+    """Mark started shows as past and return how many there were.
+
+    The update goes through the partial index on upcoming shows, and the
+    statement trigger on show moves the counts of every affected venue and
+    artist in one pass.
+    """
+    count = Show.query\
+        .filter(Show.is_upcoming, Show.start_time <= func.now())\
+        .update({Show.is_upcoming: False}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def refresh():
+    """Roll over started shows, then recompute every counter from the show table."""
+    rollover()
+    for table in ('venue', 'artist'):
+        db.session.execute("""
+        UPDATE {0} t
+        SET upcoming_shows_count = COALESCE(d.upcoming, 0), past_shows_count = COALESCE(d.past, 0)
+        FROM {0} e
+        LEFT JOIN (SELECT {0}_id AS id,
+                          COUNT(*) FILTER (WHERE is_upcoming) AS upcoming,
+                          COUNT(*) FILTER (WHERE NOT is_upcoming) AS past
+                   FROM show GROUP BY {0}_id) d ON d.id = e.id
+        WHERE t.id = e.id""".format(table))
+    db.session.commit()
@@ -0,0 +1,45 @@
+"""
+Jinja filters.
+Kept free of app imports so they can be benchmarked and reused on their own.
+----------------------------------------------------------------------------#
+ Filters.
+----------------------------------------------------------------------------#
+"""
+from datetime import datetime
+from functools import lru_cache
+
+import dateutil.parser
+import pytz
+from babel.core import Locale
+from babel.dates import LC_TIME, parse_pattern
+
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def _datetime_pattern(format):
+    # parsing the pattern is most of the cost of babel.dates.format_datetime
+    return parse_pattern(format)
+
+
+@lru_cache(maxsize=16)
+def _locale(locale):
+    return Locale.parse(locale)
+
+
+def format_datetime(value, format='medium', locale=LC_TIME):
+    """Format a datetime, or a string holding one, with a named or babel pattern.
+
+    Equivalent to babel.dates.format_datetime without a tzinfo: an aware
+    datetime is formatted in its own timezone and a naive one is taken as UTC.
+    Compiled patterns and locales are cached across calls.
+    """
+    if not isinstance(value, datetime):
+        value = dateutil.parser.parse(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=pytz.utc)
+    pattern = _datetime_pattern(DATETIME_FORMATS.get(format, format))
+    return pattern.apply(value, _locale(locale))
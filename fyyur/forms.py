@@ -1,13 +1,16 @@
 from datetime import datetime
 
+import dateutil.parser
 import pytz
 from flask_wtf import Form
-from wtforms import (BooleanField, DateTimeField, SelectField, SelectMultipleField, StringField)
-from wtforms.validators import URL, AnyOf, DataRequired, Regexp
-# can be used to create form from sqlalchemy model directly
-from wtforms.ext.sqlalchemy.orm import model_form
+from sqlalchemy.sql import exists
+from wtforms import (BooleanField, DateTimeField, SelectField, SelectMultipleField, StringField,
+                     TextAreaField)
+from wtforms.validators import URL, DataRequired, Regexp, ValidationError
 
+from fyyur import db
 from fyyur.models import Artist, Venue
+from fyyur.queries import live
 
 STATES = [
     ('AL', 'AL'),
@@ -86,14 +89,51 @@ GENRES = [
 US_TZS = [tz for tz in pytz.all_timezones if tz.startswith("US")]
 
 
+class RowExists(object):
+    """Validates that the field holds the id of an existing, not deleted row of model.
+
+    Each submission is checked with a primary key lookup when it is validated,
+    never at import, so a row deleted by any process is refused at once.
+    """
+
+    def __init__(self, model, message=None):
+        self.model = model
+        self.message = message or '{} ID does not exist'.format(model.__name__)
+
+    def __call__(self, form, field):
+        try:
+            row_id = int(field.data)
+        except (TypeError, ValueError):
+            raise ValidationError(self.message)
+        if not db.session.query(exists().where(self.model.id == row_id)
+                                .where(live(self.model))).scalar():
+            raise ValidationError(self.message)
+
+
+artist_exists = RowExists(Artist)
+venue_exists = RowExists(Venue)
+
+
+class FreeDateTimeField(DateTimeField):
+    """DateTimeField reading any date and time dateutil parses, e.g. without seconds."""
+
+    def process_formdata(self, valuelist):
+        if valuelist:
+            try:
+                self.data = dateutil.parser.parse(' '.join(valuelist))
+            except (ValueError, OverflowError):
+                self.data = None
+                raise ValueError(self.gettext('Not a valid datetime value'))
+
+
 class ShowForm(Form):
     # make sure artist id exists in DB
-    artist_id = StringField('Artist ID', validators=[DataRequired(),
-                                                     AnyOf([x.id for x in Artist.query.all()])])
+    artist_id = StringField('Artist ID', validators=[DataRequired(), artist_exists])
     # make sure venue id exists in DB
-    venue_id = StringField('Venue ID', validators=[DataRequired(),
-                                                   AnyOf([x.id for x in Venue.query.all()])])
-    start_time = DateTimeField('Start Time', validators=[DataRequired()], default=datetime.today())
+    venue_id = StringField('Venue ID', validators=[DataRequired(), venue_exists])
+    # callable so the default is the time the form is shown, not the time of import
+    start_time = FreeDateTimeField('Start Time', validators=[DataRequired()],
+                                   default=datetime.today)
     time_zone = SelectField(
         'Time Zone',
         validators=[DataRequired()],
@@ -101,6 +141,18 @@ class ShowForm(Form):
         choices=list(zip(*[US_TZS, US_TZS])))
 
 
+class ShowBatchForm(Form):
+    # one "artist ID, venue ID, start time" per line
+    rows = TextAreaField('Shows')
+    # and/or the occurrences of a recurrence rule
+    artist_id = StringField('Artist ID')
+    venue_id = StringField('Venue ID')
+    start_time = DateTimeField('First Start Time', default=datetime.today)
+    rule = StringField('Recurrence Rule')
+    time_zone = SelectField('Time Zone', validators=[DataRequired()],
+                            choices=list(zip(*[US_TZS, US_TZS])))
+
+
 class VenueForm(Form):
     name = StringField('name', validators=[DataRequired()])
     city = StringField('city', validators=[DataRequired()])
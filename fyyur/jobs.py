@@ -0,0 +1,108 @@
+"""
+Background jobs for work too long to do within a request, such as purging
+the shows of a deleted venue. Jobs are queued on a pool of worker threads,
+each runs in an app context of its own and reports its progress, which is
+served as JSON at /jobs/<id>. The queue and the job registry live in the
+worker process that queued the job, so a restart drops the jobs still
+queued; `flask jobs purge` finishes the purges they would have done.
+----------------------------------------------------------------------------#
+ Jobs.
+----------------------------------------------------------------------------#
+"""
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class Job(object):
+    """One queued function call and its progress, as reported by the function."""
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        # queued, running, done or failed
+        self.status = "queued"
+        self.done = 0
+        # None until the function knows how much work there is
+        self.total = None
+        self.error = None
+        self.queued_at = time.time()
+        self.finished_at = None
+
+    def progress(self, done, total=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def to_dict(self):
+        return {
+            "id": self.id, "name": self.name, "status": self.status, "done": self.done,
+            "total": self.total, "error": self.error, "queued_at": self.queued_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobQueue(object):
+    """Runs jobs on JOBS_WORKERS threads and keeps the last JOBS_HISTORY of them."""
+
+    def __init__(self, app=None):
+        self._lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # the threads are started on first use, so apps can be built without them
+        app.extensions['jobs'] = {'executor': None, 'jobs': OrderedDict()}
+
+    @property
+    def _state(self):
+        state = current_app.extensions['jobs']
+        if state['executor'] is None:
+            with self._lock:
+                if state['executor'] is None:
+                    state['executor'] = ThreadPoolExecutor(current_app.config["JOBS_WORKERS"],
+                                                           thread_name_prefix="fyyur-job")
+        return state
+
+    def submit(self, name, func, *args):
+        """Queue func(job, *args) and return its Job; func may call job.progress()."""
+        state = self._state
+        job = Job(name)
+        with self._lock:
+            state['jobs'][job.id] = job
+            # forget the oldest jobs, finished or not
+            while len(state['jobs']) > current_app.config["JOBS_HISTORY"]:
+                state['jobs'].popitem(last=False)
+        state['executor'].submit(self._run, current_app._get_current_object(), job, func, args)
+        return job
+
+    @staticmethod
+    def _run(app, job, func, args):
+        with app.app_context():
+            job.status = "running"
+            try:
+                func(job, *args)
+            except Exception as e:
+                logger.exception("job %s (%s) failed", job.id, job.name)
+                job.status = "failed"
+                job.error = str(e)
+            else:
+                job.status = "done"
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        """Return the job with job_id if this process queued it recently, otherwise None."""
+        return current_app.extensions['jobs']['jobs'].get(job_id)
+
+    def stats(self):
+        with self._lock:
+            jobs = list(current_app.extensions['jobs']['jobs'].values())
+        return {status: sum(job.status == status for job in jobs)
+                for status in ("queued", "running", "done", "failed")}
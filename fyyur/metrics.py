@@ -0,0 +1,217 @@
+"""
+Per-request instrumentation exposed in the Prometheus text format.
+SQLAlchemy engine events and Flask request and template signals record, for
+every request, the number of queries, the time spent in the database, the
+slowest statement, the wait for a pooled connection and the render time.
+They are aggregated per endpoint into histograms served at /metrics when
+the request is torn down, so the statements of a streamed response count.
+The text of the slowest statement of each endpoint is logged rather than
+exported, to keep the series per endpoint bounded. Each worker process
+keeps its own registry, so scrape workers individually.
+----------------------------------------------------------------------------#
+ Metrics.
+----------------------------------------------------------------------------#
+"""
+import logging
+import time
+from bisect import bisect_left
+from threading import Lock
+
+from flask import Response, current_app, g, has_request_context, request, signals_available
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+# seconds
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+# name -> (help, buckets, key of the per-request measurement)
+HISTOGRAMS = (
+    ("fyyur_request_duration_seconds", "Time to build the response.", TIME_BUCKETS, "duration"),
+    ("fyyur_request_db_queries", "SQL statements executed per request.", COUNT_BUCKETS, "queries"),
+    ("fyyur_request_db_seconds", "Time spent executing SQL per request.", TIME_BUCKETS, "db_time"),
+    ("fyyur_request_pool_wait_seconds", "Time waiting for a pooled connection per request.",
+     TIME_BUCKETS, "pool_wait"),
+    ("fyyur_request_render_seconds", "Time spent rendering templates per request.", TIME_BUCKETS,
+     "render_time"),
+)
+# longest statement text logged for the slowest query of an endpoint
+STATEMENT_MAX_LENGTH = 200
+
+
+class Histogram(object):
+    """Cumulative histogram with fixed upper bounds, as Prometheus expects."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # one count per bucket plus the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, endpoint):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf", ), self.counts):
+            cumulative += count
+            yield '{}_bucket{{endpoint="{}",le="{}"}} {}'.format(name, endpoint, bound, cumulative)
+        yield '{}_sum{{endpoint="{}"}} {}'.format(name, endpoint, self.sum)
+        yield '{}_count{{endpoint="{}"}} {}'.format(name, endpoint, self.count)
+
+
+def _current():
+    """Return the measurements of the request being handled, if any."""
+    if has_request_context():
+        return g.get("_request_metrics")
+    return None
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super(TimedQueuePool, self)._do_get()
+        finally:
+            current = _current()
+            if current is not None:
+                current["pool_wait"] += time.perf_counter() - start
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = _current()
+    if current is None or not conn.info.get("query_start_time"):
+        return
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    current["queries"] += 1
+    current["db_time"] += elapsed
+    if elapsed > current["slowest"][0]:
+        current["slowest"] = (elapsed, statement)
+
+
+class RequestMetrics(object):
+    """Collects per-endpoint request metrics and serves them at /metrics.
+
+    Collectors registered with collector() add extra gauges to the output;
+    each returns (name, value) pairs. With METRICS_DEBUG_HEADER (or in debug
+    mode) every response also carries its measurements so far in a
+    Server-Timing header; a streamed body is still to run.
+    """
+
+    def __init__(self, app=None):
+        self._lock = Lock()
+        self._collectors = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["request_metrics"] = {
+            # name -> endpoint -> Histogram
+            "histograms": {name: {} for name, _, _, _ in HISTOGRAMS},
+            # endpoint -> seconds of its slowest statement
+            "slowest": {},
+        }
+        if not app.config["METRICS_ENABLED"]:
+            return
+        # time pool checkouts; must be set before the engine is first created
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {}).setdefault("poolclass",
+                                                                          TimedQueuePool)
+        app.before_request(self._start_request)
+        app.after_request(self._add_timing_header)
+        app.teardown_request(self._finish_request)
+        # render times need blinker; without it they are reported as 0
+        if signals_available:
+            before_render_template.connect(self._start_render, app)
+            template_rendered.connect(self._finish_render, app)
+        app.add_url_rule("/metrics", "metrics", self.render)
+
+    def collector(self, function):
+        self._collectors.append(function)
+        return function
+
+    def _start_request(self):
+        g._request_metrics = {
+            "start": time.perf_counter(), "queries": 0, "db_time": 0.0, "slowest": (0, ""),
+            "pool_wait": 0.0, "render_time": 0.0, "render_start": None
+        }
+
+    def _start_render(self, app, template, context, **extra):
+        current = _current()
+        if current is not None:
+            current["render_start"] = time.perf_counter()
+
+    def _finish_render(self, app, template, context, **extra):
+        current = _current()
+        if current is not None and current["render_start"] is not None:
+            current["render_time"] += time.perf_counter() - current["render_start"]
+            current["render_start"] = None
+
+    def _add_timing_header(self, response):
+        current = _current()
+        if current is not None and (current_app.debug
+                                    or current_app.config["METRICS_DEBUG_HEADER"]):
+            response.headers["Server-Timing"] = ", ".join([
+                'db;dur={:.2f};desc="{} queries"'.format(current["db_time"] * 1e3,
+                                                         current["queries"]),
+                'pool;dur={:.2f}'.format(current["pool_wait"] * 1e3),
+                'render;dur={:.2f}'.format(current["render_time"] * 1e3),
+                'total;dur={:.2f}'.format((time.perf_counter() - current["start"]) * 1e3),
+            ])
+        return response
+
+    def _finish_request(self, exc):
+        current = g.pop("_request_metrics", None)
+        if current is None:
+            return
+        current["duration"] = time.perf_counter() - current["start"]
+        endpoint = request.endpoint or "unmatched"
+        state = current_app.extensions["request_metrics"]
+        seconds, statement = current["slowest"]
+        with self._lock:
+            for name, _, buckets, key in HISTOGRAMS:
+                histograms = state["histograms"][name]
+                if endpoint not in histograms:
+                    histograms[endpoint] = Histogram(buckets)
+                histograms[endpoint].observe(current[key])
+            slower = seconds > state["slowest"].get(endpoint, 0)
+            if slower:
+                state["slowest"][endpoint] = seconds
+        if slower:
+            logger.info("slowest statement of %s so far, %.1f ms: %s", endpoint, seconds * 1e3,
+                        " ".join(statement.split())[:STATEMENT_MAX_LENGTH])
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        state = current_app.extensions["request_metrics"]
+        lines = []
+        with self._lock:
+            for name, description, _, _ in HISTOGRAMS:
+                lines.append("# HELP {} {}".format(name, description))
+                lines.append("# TYPE {} histogram".format(name))
+                for endpoint, histogram in sorted(state["histograms"][name].items()):
+                    lines.extend(histogram.lines(name, endpoint))
+            lines.append("# HELP fyyur_slowest_query_seconds Slowest statement seen per endpoint.")
+            lines.append("# TYPE fyyur_slowest_query_seconds gauge")
+            for endpoint, seconds in sorted(state["slowest"].items()):
+                lines.append('fyyur_slowest_query_seconds{{endpoint="{}"}} {}'.format(endpoint,
+                                                                                    seconds))
+        for collect in self._collectors:
+            for name, value in collect():
+                lines.append("# TYPE {} gauge".format(name))
+                lines.append("{} {}".format(name, value))
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
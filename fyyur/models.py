@@ -15,10 +15,17 @@ from fyyur import db
 
 class Venue(db.Model):
     __tablename__ = 'venue'
+    # trigram index so name searches with ILIKE '%term%' don't scan the table and
+    # GIN index on genres for the genre listings' containment (@>) tests
+    __table_args__ = (db.Index('ix_venue_name_trgm', 'name', postgresql_using='gin',
+                               postgresql_ops={'name': 'gin_trgm_ops'}),
+                      db.Index('ix_venue_genres', 'genres', postgresql_using='gin'))
 
+    # GENERATED BY DEFAULT AS IDENTITY in the database, never assigned by the app
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
-    genres = db.Column(db.ARRAY(db.String))
+    # the PostgreSQL type, which provides the array operators such as contains()
+    genres = db.Column(postgresql.ARRAY(db.String))
     address = db.Column(db.String(120))
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
@@ -34,15 +41,31 @@ class Venue(db.Model):
     time_created = db.Column(postgresql.TIMESTAMP(timezone=True), server_default=func.now())
     # server_onupdate doesn't do anything serverside
     time_updated = db.Column(postgresql.TIMESTAMP(timezone=True), onupdate=func.now())
+    # denormalized show counts, kept current by triggers on show and by the
+    # rollover job that moves started shows from upcoming to past
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, server_default='0')
+    # last insert, update or delete of one of its shows, set by the same triggers
+    shows_changed_at = db.Column(postgresql.TIMESTAMP(timezone=True))
+    # set when the venue is deleted, which hides it at once; the row and its shows
+    # are removed afterwards by a background purge job
+    deleted_at = db.Column(postgresql.TIMESTAMP(timezone=True))
     venue_shows = db.relationship('Show', backref='venue_shows', lazy=True)
 
 
 class Artist(db.Model):
     __tablename__ = 'artist'
+    # trigram index so name searches with ILIKE '%term%' don't scan the table and
+    # GIN index on genres for the genre listings' containment (@>) tests
+    __table_args__ = (db.Index('ix_artist_name_trgm', 'name', postgresql_using='gin',
+                               postgresql_ops={'name': 'gin_trgm_ops'}),
+                      db.Index('ix_artist_genres', 'genres', postgresql_using='gin'))
 
+    # GENERATED BY DEFAULT AS IDENTITY in the database, never assigned by the app
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
-    genres = db.Column(db.ARRAY(db.String))
+    # the PostgreSQL type, which provides the array operators such as contains()
+    genres = db.Column(postgresql.ARRAY(db.String))
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     # limit phone to 10 digits
@@ -57,15 +80,38 @@ class Artist(db.Model):
     time_created = db.Column(postgresql.TIMESTAMP(timezone=True), server_default=func.now())
     # server_onupdate doesn't do anything serverside
     time_updated = db.Column(postgresql.TIMESTAMP(timezone=True), onupdate=func.now())
+    # denormalized show counts, kept current by triggers on show and by the
+    # rollover job that moves started shows from upcoming to past
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, server_default='0')
+    # last insert, update or delete of one of its shows, set by the same triggers
+    shows_changed_at = db.Column(postgresql.TIMESTAMP(timezone=True))
+    # set when the artist is deleted, which hides it at once; the row and its shows
+    # are removed afterwards by a background purge job
+    deleted_at = db.Column(postgresql.TIMESTAMP(timezone=True))
     artist_shows = db.relationship('Show', backref='artist_shows', lazy=True)
 
 
 class Show(db.Model):
     __tablename__ = 'show'
+    __table_args__ = (
+        # supports keyset pagination of the show listing in start time order
+        db.Index('ix_show_start_time_id', 'start_time', 'id'),
+        # lets the rollover job find started shows without scanning past ones
+        db.Index('ix_show_upcoming_start_time', 'start_time',
+                 postgresql_where=db.text('is_upcoming')),
+        # range scans of the shows of one venue or artist in start time order: the
+        # schedules, cursor included, and the upcoming/past partitions of the detail pages
+        db.Index('ix_show_venue_id_start_time_id', 'venue_id', 'start_time', 'id'),
+        db.Index('ix_show_artist_id_start_time_id', 'artist_id', 'start_time', 'id'),
+    )
 
+    # GENERATED BY DEFAULT AS IDENTITY in the database, never assigned by the app
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False)
     start_time = db.Column(db.TIMESTAMP(timezone=True))
+    # set by a trigger on insert, cleared by the rollover job once the show starts
+    is_upcoming = db.Column(db.Boolean, nullable=False, server_default=db.text('false'))
     venue = db.relationship('Venue', backref='show_venue')
     artist = db.relationship('Artist', backref='show_artist')
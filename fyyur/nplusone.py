@@ -0,0 +1,156 @@
+"""
+Detection of N+1 queries: the same statement run again and again by one
+request, typically a lazy relationship load or a get() inside a loop.
+Statements are fingerprinted by their parameterized SQL. In debug mode, or
+with NPLUSONE_ENABLED, a request that runs one fingerprint
+NPLUSONE_THRESHOLD times or more logs it with the app code that ran it.
+Tests bound the statements of a block with query_budget():
+
+    with query_budget(2):
+        client.get('/venues')
+----------------------------------------------------------------------------#
+ N+1 detection.
+----------------------------------------------------------------------------#
+"""
+import logging
+import os
+import re
+import threading
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# app frames reported per call site, innermost first
+CALL_SITE_DEPTH = 3
+# a list of bound parameters, e.g. an IN list, whose length varies between runs
+PARAMETER_LIST = re.compile(r"\(\s*%\(\w+\)s(?:\s*,\s*%\(\w+\)s)*\s*\)")
+
+# the QueryLogs recording the statements run by each thread
+_local = threading.local()
+
+
+def fingerprint(statement):
+    """Return statement with its whitespace and lists of parameters collapsed."""
+    return PARAMETER_LIST.sub("(...)", " ".join(statement.split()))
+
+
+def call_site():
+    """Return where the app code runs the current statement, innermost frame first."""
+    frames = [frame for frame in reversed(traceback.extract_stack())
+              if frame.filename.startswith(PACKAGE_DIR) and frame.filename != __file__]
+    return " <- ".join("{}:{} in {}".format(os.path.relpath(frame.filename, PACKAGE_DIR),
+                                            frame.lineno, frame.name)
+                       for frame in frames[:CALL_SITE_DEPTH]) or "outside the app"
+
+
+class QueryLog(object):
+    """Counts the statements run while it is active, per fingerprint.
+
+    The call site of a fingerprint is taken when it reaches threshold runs,
+    so statements that don't repeat cost no stack inspection.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.count = 0
+        self.fingerprints = Counter()
+        self.call_sites = {}
+
+    def record(self, statement):
+        key = fingerprint(statement)
+        self.count += 1
+        self.fingerprints[key] += 1
+        if self.fingerprints[key] == self.threshold:
+            self.call_sites[key] = call_site()
+
+    def repeated(self):
+        """Return (fingerprint, runs, call site) of every statement run threshold times or more."""
+        return [(key, runs, self.call_sites[key]) for key, runs in self.fingerprints.most_common()
+                if runs >= self.threshold]
+
+    def start(self):
+        _logs().append(self)
+        return self
+
+    def stop(self):
+        _logs().remove(self)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _logs():
+    if not hasattr(_local, "logs"):
+        _local.logs = []
+    return _local.logs
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for log in getattr(_local, "logs", ()):
+        log.record(statement)
+
+
+def _describe(repeated):
+    return "\n".join("  {} runs of {}\n    from {}".format(runs, key, site)
+                     for key, runs, site in repeated)
+
+
+@contextmanager
+def query_budget(max_queries, threshold=3):
+    """Fail the block with AssertionError if it runs more than max_queries statements.
+
+    It also fails if a single statement runs threshold times or more, whatever
+    the budget. The QueryLog is yielded for further checks.
+    """
+    with QueryLog(threshold) as log:
+        yield log
+    problems = []
+    if log.count > max_queries:
+        problems.append("{} statements run, over the budget of {}".format(log.count,
+                                                                          max_queries))
+    repeated = log.repeated()
+    if repeated:
+        problems.append("repeated statements:\n" + _describe(repeated))
+    if problems:
+        raise AssertionError("\n".join(problems))
+
+
+class NPlusOneDetector(object):
+    """Logs the statements each request runs NPLUSONE_THRESHOLD times or more.
+
+    Active in debug mode or with NPLUSONE_ENABLED; otherwise a request costs
+    one config lookup.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._start_request)
+        app.teardown_request(self._finish_request)
+
+    def _start_request(self):
+        if current_app.debug or current_app.config["NPLUSONE_ENABLED"]:
+            g._query_log = QueryLog(current_app.config["NPLUSONE_THRESHOLD"]).start()
+
+    def _finish_request(self, exc):
+        log = g.pop("_query_log", None)
+        if log is None:
+            return
+        log.stop()
+        repeated = log.repeated()
+        if repeated:
+            logger.warning("possible N+1 queries in %s %s (%s):\n%s", request.method, request.path,
+                           request.endpoint, _describe(repeated))
@@ -0,0 +1,76 @@
+"""
+Deletion of venues and artists.
+Deleting a venue or an artist only sets its deleted_at, which every read
+filters on, so it disappears at once along with its shows. Its shows and
+then the row itself are removed later by purge(), in batches of bounded
+size each committed on its own, so no transaction loads or locks years of
+shows at once. Show counters of the other side of the bookings are updated
+by the show triggers as the batches are deleted.
+----------------------------------------------------------------------------#
+ Purge.
+----------------------------------------------------------------------------#
+"""
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import func
+
+from fyyur import db
+from fyyur.models import Show
+from fyyur.queries import live
+
+
+def soft_delete(model, entity_id):
+    """Mark a venue or artist as deleted and return whether it existed; the caller commits.
+
+    Its modification time is updated as well so the pages listing it change
+    their validators.
+    """
+    return model.query\
+        .filter(model.id == entity_id, live(model))\
+        .update({model.deleted_at: func.now(), model.time_updated: func.now()},
+                synchronize_session=False) == 1
+
+
+def deleted_ids(model):
+    """Return the ids of the venues or artists deleted but not purged yet."""
+    return [entity_id for entity_id, in
+            db.session.query(model.id).filter(model.deleted_at.isnot(None)).order_by(model.id)]
+
+
+def purge(model, entity_id, batch_size, report=None):
+    """Delete the shows of a deleted venue or artist, then the row itself.
+
+    Shows are deleted batch_size at a time through the (venue_id, start_time,
+    id) or (artist_id, start_time, id) index, with a commit after each batch and
+    report(done, total) called after every commit. The row goes in the same
+    transaction as the last batch; a show added to it meanwhile makes that
+    fail, in which case deletion simply goes on. Returns the number of shows
+    deleted.
+    """
+    show_key = getattr(Show, model.__tablename__ + "_id")
+    total = db.session.query(func.count(Show.id)).filter(show_key == entity_id).scalar()
+    done = 0
+    if report is not None:
+        report(done, total)
+    while True:
+        batch = db.session.query(Show.id).filter(show_key == entity_id).limit(batch_size)
+        count = Show.query\
+            .filter(Show.id.in_(batch))\
+            .delete(synchronize_session=False)
+        done += count
+        if count < batch_size:
+            try:
+                model.query\
+                    .filter(model.id == entity_id, model.deleted_at.isnot(None))\
+                    .delete(synchronize_session=False)
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                done -= count
+                continue
+            break
+        db.session.commit()
+        if report is not None:
+            report(done, max(total, done))
+    if report is not None:
+        report(done, max(total, done))
+    return done
@@ -0,0 +1,450 @@
+"""
+Read queries used by the views.
+Each query pushes the filtering, counting and grouping down to the database
+so that a page costs a fixed number of statements regardless of catalog size.
+
+The reads served by the async mode are written once as plans: generators
+that yield the SQLAlchemy queries they need, receive the rows of each and
+return their result. run() executes a plan on the session and fyyur.asgi
+executes the same plans on asyncpg.
+
+Deleted venues and artists are left out of every read, and so are their
+shows, from the moment they are deleted until they are purged.
+----------------------------------------------------------------------------#
+ Queries.
+----------------------------------------------------------------------------#
+"""
+from itertools import groupby
+
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import func, literal, tuple_
+
+from fyyur import db
+from fyyur.models import Artist, Show, Venue
+
+
+def select(*entities):
+    """Start a query that is not bound to a session, for use in a plan."""
+    return Query(entities)
+
+
+def run(plan):
+    """Execute a plan on the session and return its result."""
+    rows = None
+    while True:
+        try:
+            query = plan.send(rows)
+        except StopIteration as stop:
+            return stop.value
+        rows = query.with_session(db.session()).all()
+
+
+def _first(rows):
+    return rows[0] if rows else None
+
+
+def live(model):
+    """Return the criterion excluding deleted venues or artists, which every read applies."""
+    return model.deleted_at.is_(None)
+
+
+def modified_at(model):
+    """Return when a venue or artist was last edited, or created if it never was."""
+    return func.coalesce(model.time_updated, model.time_created)
+
+
+def venue_areas_plan():
+    """Return venues grouped by city/state with their upcoming show counts.
+
+    Runs as a single SELECT over venue alone; upcoming show counts are read
+    from the counter maintained on each venue.
+    """
+    # substitute NULLs in state and city with N/A - this will be a group
+    city = func.coalesce(Venue.city, 'N/A')
+    state = func.coalesce(Venue.state, 'N/A')
+    rows = yield select(city, state, Venue.id, Venue.name, Venue.upcoming_shows_count)\
+        .filter(live(Venue))\
+        .order_by(state, city, Venue.id)
+    data = []
+    # rows are ordered by area so consecutive rows share a city/state group
+    for (area_city, area_state), area_rows in groupby(rows, key=lambda row: (row[0], row[1])):
+        data.append({
+            "city": area_city, "state": area_state, "venues": [{
+                "id": venue_id, "name": name, "num_upcoming_shows": num_upcoming_shows
+            } for _, _, venue_id, name, num_upcoming_shows in area_rows]
+        })
+    return data
+
+
+def venue_areas():
+    return run(venue_areas_plan())
+
+
+def next_rollover():
+    """Return when the upcoming show counters change next, or None if no show is upcoming.
+
+    That is the start time of the earliest show still counted as upcoming,
+    read from the partial index on upcoming shows. It is in the past while
+    started shows wait for the rollover job, so pages caching the counters
+    until then are not cached before the job has run.
+    """
+    return db.session.query(func.min(Show.start_time)).filter(Show.is_upcoming).scalar()
+
+
+def entity_plan(model, entity_id):
+    """Return every column of one venue or artist as a dict, or None if it does not exist."""
+    columns = list(model.__table__.columns)
+    row = _first((yield select(*columns).filter(model.id == entity_id, live(model))))
+    return dict(zip([column.name for column in columns], row)) if row is not None else None
+
+
+def _partitioned_shows_plan(criterion, other, prefix, now, limit):
+    """Return upcoming and past shows matching criterion, each capped at limit.
+
+    Shows are joined to the other side of the booking (the artist for a venue
+    page, the venue for an artist page) and only the columns rendered are
+    selected, with its modification time to key the cached show tiles. The
+    total size of each partition is taken from a window count, which is
+    evaluated before LIMIT so it is exact even when capped.
+    """
+    def partition(is_upcoming):
+        query = select(Show.start_time, other.id, other.name, other.image_link,
+                       modified_at(other), func.count().over())\
+            .join(other, other.id == getattr(Show, prefix + "_id"))\
+            .filter(criterion, live(other))
+        if is_upcoming:
+            # soonest upcoming first
+            query = query.filter(Show.start_time >= now).order_by(Show.start_time, Show.id)
+        else:
+            # most recent past show first
+            query = query.filter(Show.start_time < now).order_by(Show.start_time.desc(),
+                                                                 Show.id.desc())
+        return query.limit(limit)
+
+    def shows(rows):
+        shows = [{
+            prefix + "_id": other_id, prefix + "_name": name, prefix + "_image_link": image_link,
+            prefix + "_updated": updated, "start_time": start_time
+        } for start_time, other_id, name, image_link, updated, _ in rows]
+        # count is repeated on every row; no rows means an empty partition
+        return shows, rows[0][-1] if rows else 0, rows[0][0] if rows else None
+
+    upcoming_shows, upcoming_shows_count, next_show_start = shows((yield partition(True)))
+    past_shows, past_shows_count, _ = shows((yield partition(False)))
+    return {
+        "upcoming_shows": upcoming_shows, "upcoming_shows_count": upcoming_shows_count,
+        "past_shows": past_shows, "past_shows_count": past_shows_count,
+        # when the soonest upcoming show turns into a past show
+        "next_show_start": next_show_start
+    }
+
+
+def venue_shows_plan(venue_id, now, limit):
+    """Return the upcoming and past shows at a venue along with their artists."""
+    return _partitioned_shows_plan(Show.venue_id == venue_id, Artist, "artist", now, limit)
+
+
+def venue_shows(venue_id, now, limit):
+    return run(venue_shows_plan(venue_id, now, limit))
+
+
+def artist_shows_plan(artist_id, now, limit):
+    """Return the upcoming and past shows of an artist along with their venues."""
+    return _partitioned_shows_plan(Show.artist_id == artist_id, Venue, "venue", now, limit)
+
+
+def artist_shows(artist_id, now, limit):
+    return run(artist_shows_plan(artist_id, now, limit))
+
+
+def _detail_version_plan(model, entity_id, criterion, other, prefix, now):
+    """Return what the detail page of an entity depends on, or None if it does not exist.
+
+    A single SELECT of scalar subqueries returns the entity's modification
+    time, the last change to its shows, the start of its latest started show
+    (pages change when a show moves from upcoming to past), the latest
+    modification of the other side of its bookings and, last, the start of
+    its next show, which is when the page will change next.
+    """
+    last_started = select(func.max(Show.start_time))\
+        .filter(criterion, Show.start_time <= now)\
+        .as_scalar()
+    next_start = select(func.min(Show.start_time))\
+        .filter(criterion, Show.start_time > now)\
+        .as_scalar()
+    others_updated = select(func.max(modified_at(other)))\
+        .join(Show, other.id == getattr(Show, prefix + "_id"))\
+        .filter(criterion)\
+        .as_scalar()
+    return _first((yield select(modified_at(model), model.shows_changed_at, last_started,
+                                others_updated, next_start)
+                   .filter(model.id == entity_id, live(model))))
+
+
+def venue_version_plan(venue_id, now):
+    """Return the validators of a venue page, see _detail_version_plan."""
+    return _detail_version_plan(Venue, venue_id, Show.venue_id == venue_id, Artist, "artist", now)
+
+
+def venue_version(venue_id, now):
+    return run(venue_version_plan(venue_id, now))
+
+
+def artist_version_plan(artist_id, now):
+    """Return the validators of an artist page, see _detail_version_plan."""
+    return _detail_version_plan(Artist, artist_id, Show.artist_id == artist_id, Venue, "venue",
+                                now)
+
+
+def artist_version(artist_id, now):
+    return run(artist_version_plan(artist_id, now))
+
+
+# pg_trgm indexes names by three character trigrams; shorter search terms
+# are not ranked, see search_names_plan()
+MIN_RANKED_TERM_LENGTH = 3
+
+
+def _escape_like(term):
+    """Escape LIKE wildcards so the search term is matched literally."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_names_plan(model, search_term, page, limit):
+    """Return one page of entities whose name contains search_term.
+
+    Case insensitive substring matching uses ILIKE, which the trigram index
+    on name can serve, and hits are ranked by trigram similarity to the term.
+    Upcoming show counts are read from the counter on each entity and the
+    total number of hits from a window count, so the page is a single SELECT.
+
+    A term shorter than a trigram cannot use the index and matches most
+    names, so ranking and counting would read every row: such hits are
+    listed by id instead, without a count, reading up to one row past the
+    page to tell whether more follow.
+    """
+    search_term = search_term.strip()
+    criteria = [live(model)]
+    if search_term:
+        criteria.append(model.name.ilike("%{}%".format(_escape_like(search_term)), escape='\\'))
+    if len(search_term) < MIN_RANKED_TERM_LENGTH:
+        rows = yield select(model.id, model.name, model.upcoming_shows_count)\
+            .filter(*criteria)\
+            .order_by(model.id)\
+            .offset((page - 1) * limit)\
+            .limit(limit + 1)
+        count, more, rows = None, len(rows) > limit, rows[:limit]
+    else:
+        rows = yield select(model.id, model.name, model.upcoming_shows_count,
+                            func.count().over())\
+            .filter(*criteria)\
+            .order_by(func.similarity(model.name, search_term).desc(), model.id)\
+            .offset((page - 1) * limit)\
+            .limit(limit)
+        # total is repeated on every row; a page past the end has no rows
+        count = rows[0][-1] if rows else 0
+        more = page * limit < count
+    return {
+        "count": count,
+        "more": more,
+        "page": page,
+        "limit": limit,
+        "data": [{
+            "id": entity_id, "name": name, "num_upcoming_shows": upcoming
+        } for entity_id, name, upcoming, *_ in rows]
+    }
+
+
+def search_names(model, search_term, page, limit):
+    return run(search_names_plan(model, search_term, page, limit))
+
+
+def _keyset_page_plan(query, keys, after, limit):
+    """Return up to limit rows of query ordered by keys and following the cursor after.
+
+    The cursor is the tuple of key values of the last row already seen, so a
+    page is a range scan on the key index however deep it is. keys must be
+    the leading columns of the query so the next cursor can be read off the
+    last row. The cursor of the next page is None once the last page is reached.
+    """
+    if after is not None:
+        query = query.filter(tuple_(*keys) > tuple_(*after))
+    # fetch one extra row to find out whether there is a next page
+    rows = yield query.order_by(*keys).limit(limit + 1)
+    next_after = tuple(rows[limit - 1][:len(keys)]) if len(rows) > limit else None
+    return rows[:limit], next_after
+
+
+def _keyset_stream(query, keys, after, batch_size):
+    """Yield every row of query following the cursor after from a server-side cursor."""
+    if after is not None:
+        query = query.filter(tuple_(*keys) > tuple_(*after))
+    # stream_results opens a named cursor so only batch_size rows are held at a time
+    return query.with_session(db.session())\
+        .order_by(*keys)\
+        .execution_options(stream_results=True)\
+        .yield_per(batch_size)
+
+
+def _artists_query():
+    return select(Artist.id, Artist.name).filter(live(Artist))
+
+
+def _artist_row(row):
+    artist_id, name = row
+    return {"id": artist_id, "name": name}
+
+
+def artists_page_plan(after, limit):
+    """Return one page of artists ordered by id and the cursor of the next page."""
+    rows, next_after = yield from _keyset_page_plan(_artists_query(), (Artist.id, ), after, limit)
+    return [_artist_row(row) for row in rows], next_after
+
+
+def artists_page(after, limit):
+    return run(artists_page_plan(after, limit))
+
+
+def iter_artists(after, batch_size):
+    """Yield all artists ordered by id as they are read from the database."""
+    return (_artist_row(row)
+            for row in _keyset_stream(_artists_query(), (Artist.id, ), after, batch_size))
+
+
+# the columns of a show by field name, as the API serves them
+SHOW_COLUMNS = {
+    "venue_id": Show.venue_id, "venue_name": Venue.name, "artist_id": Show.artist_id,
+    "artist_name": Artist.name, "artist_image_link": Artist.image_link,
+    "start_time": Show.start_time,
+}
+
+
+def _shows_query(*columns):
+    """Select the start time, id and columns of the shows of live venues and artists.
+
+    The columns default to those read by _show_row().
+    """
+    columns = columns or (Show.venue_id, Venue.name, Show.artist_id, Artist.name,
+                          Artist.image_link, modified_at(Venue), modified_at(Artist))
+    return select(Show.start_time, Show.id, *columns)\
+        .join(Venue, Venue.id == Show.venue_id)\
+        .join(Artist, Artist.id == Show.artist_id)\
+        .filter(live(Venue), live(Artist))
+
+
+def _show_row(row):
+    (start_time, _, venue_id, venue_name, artist_id, artist_name, artist_image_link,
+     venue_updated, artist_updated) = row
+    return {
+        "venue_id": venue_id, "venue_name": venue_name, "artist_id": artist_id,
+        "artist_name": artist_name, "artist_image_link": artist_image_link,
+        "start_time": start_time, "venue_updated": venue_updated, "artist_updated": artist_updated
+    }
+
+
+def shows_page_plan(after, limit):
+    """Return one page of shows ordered by start time and the cursor of the next page."""
+    rows, next_after = yield from _keyset_page_plan(_shows_query(), (Show.start_time, Show.id),
+                                                    after, limit)
+    return [_show_row(row) for row in rows], next_after
+
+
+def shows_page(after, limit):
+    return run(shows_page_plan(after, limit))
+
+
+def show_fields_page(fields, after, limit):
+    """Return the named fields of one page of shows ordered by start time and the next cursor.
+
+    Only the columns of fields are selected; the joins stay, since they leave
+    out the shows of deleted venues and artists.
+    """
+    query = _shows_query(*[SHOW_COLUMNS[field] for field in fields])
+    rows, next_after = run(_keyset_page_plan(query, (Show.start_time, Show.id), after, limit))
+    return [dict(zip(fields, row[2:])) for row in rows], next_after
+
+
+def schedule_page_plan(criteria, start, end, after, limit):
+    """Return a page of the shows matching criteria starting in [start, end) and the next cursor.
+
+    Shows are ordered by start time like the show listing. Filtered by venue or
+    artist the range is read from the (venue_id, start_time, id) or (artist_id,
+    start_time, id) index, cursor included, otherwise from the start time index.
+    """
+    query = _shows_query().filter(Show.start_time >= start, Show.start_time < end, *criteria)
+    rows, next_after = yield from _keyset_page_plan(query, (Show.start_time, Show.id), after,
+                                                    limit)
+    return [_show_row(row) for row in rows], next_after
+
+
+def schedule_page(criteria, start, end, after, limit):
+    return run(schedule_page_plan(criteria, start, end, after, limit))
+
+
+def iter_shows(after, batch_size):
+    """Yield all shows ordered by start time as they are read from the database."""
+    return (_show_row(row) for row in _keyset_stream(_shows_query(), (Show.start_time, Show.id),
+                                                      after, batch_size))
+
+
+def genre_counts():
+    """Return {genre: (venue count, artist count)} for every genre listed by a venue or artist.
+
+    One aggregate over the unnested genres of both tables; it reads every row,
+    so callers cache the result.
+    """
+    genres = db.session.query(func.unnest(Venue.genres).label("genre"),
+                              literal("venue").label("kind"))\
+        .filter(live(Venue))\
+        .union_all(db.session.query(func.unnest(Artist.genres), literal("artist"))
+                   .filter(live(Artist)))\
+        .subquery()
+    rows = db.session.query(genres.c.genre,
+                            func.count().filter(genres.c.kind == "venue"),
+                            func.count().filter(genres.c.kind == "artist"))\
+        .group_by(genres.c.genre)\
+        .all()
+    return {genre: (venues, artists) for genre, venues, artists in rows}
+
+
+def genre_page(model, genre, after, limit):
+    """Return one page of the venues or artists listing genre, ordered by id, and the next cursor.
+
+    The array containment test is answered from the GIN index on genres.
+    """
+    query = select(model.id, model.name, model.upcoming_shows_count)\
+        .filter(model.genres.contains([genre]), live(model))
+    rows, next_after = run(_keyset_page_plan(query, (model.id, ), after, limit))
+    return [{
+        "id": entity_id, "name": name, "num_upcoming_shows": upcoming
+    } for entity_id, name, upcoming in rows], next_after
+
+
+def entity_version(model, entity_id):
+    """Return the modification time and show counts of an entity, or None if it does not exist.
+
+    The modification time is the latest of its edits and of changes to its
+    shows, None if neither was recorded, e.g. for rows loaded by COPY.
+    Together they determine everything the API returns for the entity, so
+    they validate a cached copy without loading the row itself.
+    """
+    # GREATEST skips NULLs
+    return db.session.query(func.greatest(modified_at(model), model.shows_changed_at),
+                            model.upcoming_shows_count, model.past_shows_count)\
+        .filter(model.id == entity_id, live(model))\
+        .first()
+
+
+def entity_fields(model, entity_id, fields):
+    """Return the named columns of one entity as a dict, or None if it does not exist."""
+    row = db.session.query(*[getattr(model, field) for field in fields])\
+        .filter(model.id == entity_id, live(model))\
+        .first()
+    return dict(zip(fields, row)) if row is not None else None
+
+
+def entities_page(model, fields, after, limit):
+    """Return the named columns of one page of entities ordered by id and the next cursor."""
+    query = select(model.id, *[getattr(model, field) for field in fields]).filter(live(model))
+    rows, next_after = run(_keyset_page_plan(query, (model.id, ), after, limit))
+    return [dict(zip(fields, row[1:])) for row in rows], next_after
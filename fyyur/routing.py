@@ -0,0 +1,195 @@
+"""
+Routing of the reads of read-only views to replicas of the database.
+SQLALCHEMY_REPLICA_URIS lists the replicas, which are added to the
+Flask-SQLAlchemy binds. The SELECTs of views decorated with
+replicas.reads go to one replica per request, picked in turn among those
+that are up; flushes, every other statement, text ones and SELECT ... FOR
+UPDATE included, and every other view use the primary. A client that has
+just written reads from the primary for REPLICA_READ_YOUR_WRITES_SECONDS,
+so the page a create redirects to shows what was created even if the
+replicas lag behind. A view whose replica
+goes down while it runs is run again on another replica or the primary.
+----------------------------------------------------------------------------#
+ Routing.
+----------------------------------------------------------------------------#
+"""
+import logging
+import time
+from functools import wraps
+from threading import Lock
+
+from flask import current_app, g, has_app_context, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import event, orm
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.sql.expression import SelectBase
+
+logger = logging.getLogger(__name__)
+
+# session key holding when the client may read from the replicas again
+PIN_KEY = 'read_primary_until'
+
+
+class ReplicaSet(object):
+    """The replica engines of an app, handed out in turn among the healthy ones.
+
+    Each replica is probed with a trivial query at most every check_interval
+    seconds, from the request that finds the check due. A replica whose
+    connection fails in between is marked down at once and stays down
+    until a probe succeeds; with every replica down the primary serves the
+    reads.
+    """
+
+    def __init__(self, engines, check_interval):
+        self.engines = engines
+        self.check_interval = check_interval
+        self._healthy = [True] * len(engines)
+        self._checked_at = [time.time()] * len(engines)
+        self._next = 0
+        self._lock = Lock()
+        for engine in engines:
+            event.listen(engine, 'handle_error', self._handle_error)
+
+    def _handle_error(self, context):
+        # connection refused, or a connection lost during a query
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.engine)
+
+    def is_healthy(self, engine):
+        return self._healthy[self.engines.index(engine)]
+
+    def mark_down(self, engine):
+        index = self.engines.index(engine)
+        if self._healthy[index]:
+            logger.warning("replica %r is down", engine.url)
+        self._healthy[index] = False
+
+    def probe(self, index):
+        try:
+            with self.engines[index].connect() as connection:
+                connection.scalar("SELECT 1")
+        except SQLAlchemyError as e:
+            logger.warning("replica %r failed its health check: %s", self.engines[index].url, e)
+            self._healthy[index] = False
+        else:
+            self._healthy[index] = True
+
+    def _check_due(self):
+        now = time.time()
+        due = []
+        with self._lock:
+            # claimed under the lock so concurrent requests don't probe the same replica
+            for index, checked_at in enumerate(self._checked_at):
+                if checked_at + self.check_interval <= now:
+                    self._checked_at[index] = now
+                    due.append(index)
+        for index in due:
+            self.probe(index)
+
+    def choose(self):
+        """Return the next healthy replica engine, or None if they are all down."""
+        self._check_due()
+        with self._lock:
+            for _ in self.engines:
+                index = self._next
+                self._next = (self._next + 1) % len(self.engines)
+                if self._healthy[index]:
+                    return self.engines[index]
+        return None
+
+    def stats(self):
+        return {"replicas": len(self.engines), "replicas_up": sum(self._healthy)}
+
+
+class RoutingSession(SignallingSession):
+    """Session sending the SELECTs of replica reads to a replica and the rest to the primary."""
+
+    def get_bind(self, mapper=None, clause=None):
+        if not has_app_context():
+            return super(RoutingSession, self).get_bind(mapper, clause)
+        if self._flushing or (clause is not None and not isinstance(clause, SelectBase)) \
+                or getattr(clause, '_for_update_arg', None) is not None:
+            # the client will want to read this write back; text statements may write too
+            g.db_wrote = True
+        elif isinstance(clause, SelectBase) and g.get('db_replica_reads') \
+                and not g.get('db_wrote'):
+            # reads following a write of the same request read it back from the primary
+            if 'db_replica' not in g:
+                # one replica for the whole request, so its reads are consistent
+                replicas = current_app.extensions['replicas']['replicas']
+                g.db_replica = replicas.choose() if replicas is not None else None
+            if g.db_replica is not None:
+                return g.db_replica
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy whose sessions are RoutingSessions."""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+class ReplicaRouter(object):
+    """Sets up the replicas of an app and marks the views that may read from them."""
+
+    def __init__(self, app=None):
+        self._lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # replicas are binds, so their engines get the same options as the primary's
+        replica_binds = {"replica{}".format(index): uri
+                         for index, uri in enumerate(app.config["SQLALCHEMY_REPLICA_URIS"])}
+        app.config["SQLALCHEMY_BINDS"] = dict(app.config.get("SQLALCHEMY_BINDS") or {},
+                                              **replica_binds)
+        # the engines are created on first use
+        app.extensions['replicas'] = {'replicas': None, 'bind_keys': sorted(replica_binds)}
+        app.after_request(self._pin_after_write)
+
+    def _replicas(self):
+        state = current_app.extensions['replicas']
+        if state['replicas'] is None and state['bind_keys']:
+            with self._lock:
+                if state['replicas'] is None:
+                    db = current_app.extensions['sqlalchemy'].db
+                    state['replicas'] = ReplicaSet(
+                        [db.get_engine(current_app, bind=key) for key in state['bind_keys']],
+                        current_app.config["REPLICA_CHECK_INTERVAL"])
+        return state['replicas']
+
+    def _use_replica(self):
+        """Let the current request read from a replica unless its client has just written."""
+        if session.get(PIN_KEY, 0) > time.time():
+            return
+        # expired; dropping it lets the session cookie go away
+        session.pop(PIN_KEY, None)
+        if self._replicas() is not None:
+            g.db_replica_reads = True
+
+    def reads(self, view):
+        """Decorate a view whose queries may be answered by a replica."""
+        @wraps(view)
+        def wrapper(**kwargs):
+            self._use_replica()
+            try:
+                return view(**kwargs)
+            except DBAPIError:
+                replica = g.pop('db_replica', None)
+                # marked down by the failure itself; anything else is not the replica's doing
+                if replica is None or self._replicas().is_healthy(replica):
+                    raise
+                current_app.extensions['sqlalchemy'].db.session.rollback()
+                return view(**kwargs)
+
+        return wrapper
+
+    def _pin_after_write(self, response):
+        if g.get('db_wrote'):
+            session[PIN_KEY] = time.time() + current_app.config["REPLICA_READ_YOUR_WRITES_SECONDS"]
+        return response
+
+    def stats(self):
+        replicas = self._replicas()
+        return replicas.stats() if replicas is not None else {"replicas": 0, "replicas_up": 0}
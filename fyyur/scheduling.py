@@ -0,0 +1,155 @@
+"""
+Batch show scheduling.
+A batch is a list of (artist, venue, start time) rows, given one per line
+and/or expanded from a recurrence rule. Rows are checked together with one
+query per kind of check, and the valid ones are written with one multi-row
+INSERT. A row that fails on insert is rejected alone and the rest of the
+batch is still written.
+----------------------------------------------------------------------------#
+ Scheduling.
+----------------------------------------------------------------------------#
+"""
+import csv
+from itertools import islice
+
+import dateutil.parser
+import pytz
+from dateutil.rrule import rrulestr
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import tuple_
+
+from fyyur import db
+from fyyur.models import Artist, Show, Venue
+from fyyur.queries import live
+
+
+class BatchRow(object):
+    """One show of a batch: where it came from and, once processed, its id or error."""
+
+    def __init__(self, source, artist_id=None, venue_id=None, start_time=None, error=None):
+        # e.g. "line 3" or "occurrence 2"
+        self.source = source
+        self.artist_id = artist_id
+        self.venue_id = venue_id
+        self.start_time = start_time
+        self.error = error
+        self.show_id = None
+
+    def values(self):
+        return {"artist_id": self.artist_id, "venue_id": self.venue_id,
+                "start_time": self.start_time}
+
+
+def _localize(time_zone, text):
+    # interpret the entered wall clock time in the chosen time zone
+    return time_zone.localize(dateutil.parser.parse(text))
+
+
+def parse_rows(text, time_zone):
+    """Parse lines of "artist_id, venue_id, start time" into BatchRows.
+
+    Blank lines are skipped; a line that doesn't parse becomes a row with an error.
+    """
+    time_zone = pytz.timezone(time_zone)
+    rows = []
+    for line, fields in enumerate(csv.reader(text.splitlines()), 1):
+        fields = [field.strip() for field in fields]
+        if not any(fields):
+            continue
+        if len(fields) != 3:
+            rows.append(BatchRow("line {}".format(line),
+                                 error="expected artist ID, venue ID and start time"))
+            continue
+        try:
+            rows.append(BatchRow("line {}".format(line), int(fields[0]), int(fields[1]),
+                                 _localize(time_zone, fields[2])))
+        except (ValueError, OverflowError) as e:
+            rows.append(BatchRow("line {}".format(line), error="cannot parse: {}".format(e)))
+    return rows
+
+
+def expand_rule(artist_id, venue_id, first_start, rule, time_zone, max_rows):
+    """Return a BatchRow for every occurrence of the RFC 5545 recurrence rule from first_start.
+
+    rule is e.g. "FREQ=WEEKLY;COUNT=8". Occurrences are computed in local time
+    and then localized, so a weekly 8pm residency stays at 8pm across daylight
+    saving changes. Raises ValueError for an invalid rule or one with more
+    than max_rows occurrences.
+    """
+    time_zone = pytz.timezone(time_zone)
+    start = dateutil.parser.parse(first_start)
+    occurrences = list(islice(rrulestr(rule, dtstart=start.replace(tzinfo=None)), max_rows + 1))
+    if len(occurrences) > max_rows:
+        raise ValueError("the rule has more than {} occurrences".format(max_rows))
+    return [BatchRow("occurrence {}".format(number), int(artist_id), int(venue_id),
+                     time_zone.localize(occurrence))
+            for number, occurrence in enumerate(occurrences, 1)]
+
+
+def validate(rows):
+    """Set the error of every row that can't be inserted; rows with errors are left as they are.
+
+    Unknown or deleted artist and venue ids and already listed shows are each found with
+    a single query for the whole batch.
+    """
+    pending = [row for row in rows if row.error is None]
+    artist_ids = {row.artist_id for row in pending}
+    venue_ids = {row.venue_id for row in pending}
+    known_artists = {artist_id for artist_id, in
+                     db.session.query(Artist.id).filter(Artist.id.in_(artist_ids), live(Artist))} \
+        if artist_ids else set()
+    known_venues = {venue_id for venue_id, in
+                    db.session.query(Venue.id).filter(Venue.id.in_(venue_ids), live(Venue))} \
+        if venue_ids else set()
+    keys = {(row.artist_id, row.venue_id, row.start_time) for row in pending}
+    listed = set(db.session.query(Show.artist_id, Show.venue_id, Show.start_time)
+                 .filter(tuple_(Show.artist_id, Show.venue_id, Show.start_time).in_(keys))) \
+        if keys else set()
+    # the first row of each show, to point duplicates at it
+    seen = {}
+    for row in pending:
+        key = (row.artist_id, row.venue_id, row.start_time)
+        if row.artist_id not in known_artists:
+            row.error = "Artist ID {} does not exist".format(row.artist_id)
+        elif row.venue_id not in known_venues:
+            row.error = "Venue ID {} does not exist".format(row.venue_id)
+        elif key in listed:
+            row.error = "this show is already listed"
+        elif key in seen:
+            row.error = "duplicate of {}".format(seen[key])
+        else:
+            seen[key] = row.source
+    return rows
+
+
+def _insert(rows):
+    table = Show.__table__
+    # VALUES rows come back from RETURNING in the order they were given
+    return db.session.execute(table.insert().values([row.values() for row in rows])
+                              .returning(table.c.id)).fetchall()
+
+
+def insert(rows):
+    """Insert the rows without an error and set their show_id; the caller commits.
+
+    All valid rows go in one INSERT. If it fails, e.g. because a venue was
+    deleted since validation, each row is retried in a savepoint of its own
+    so only the failing rows are rejected.
+    """
+    valid = [row for row in rows if row.error is None]
+    if not valid:
+        return rows
+    try:
+        with db.session.begin_nested():
+            ids = _insert(valid)
+    except SQLAlchemyError:
+        for row in valid:
+            try:
+                with db.session.begin_nested():
+                    (row.show_id, ), = _insert([row])
+            except SQLAlchemyError as e:
+                row.error = str(getattr(e, "orig", e)).strip().splitlines()[0]
+    else:
+        for row, (show_id, ) in zip(valid, ids):
+            row.show_id = show_id
+    return rows
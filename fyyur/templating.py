@@ -0,0 +1,72 @@
+"""
+Template compilation and fragment caching.
+Compiled templates are kept in a bytecode cache on disk, so a worker loads
+them instead of parsing and compiling each template on first use; `flask
+templates compile` fills the cache at deploy time. Parts of a page that
+depend on one entity are rendered once and reused from a per-worker LRU:
+
+    {% call fragment('venue-card', venue.id, venue.time_updated or venue.time_created) %}
+      ...
+    {% endcall %}
+
+The key includes the modification time of what the fragment shows, or its
+creation time if it was never edited, so an edit, or a row imported again
+under the same id, changes the key instead of requiring invalidation.
+----------------------------------------------------------------------------#
+ Templating.
+----------------------------------------------------------------------------#
+"""
+import logging
+import os
+
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache
+
+from fyyur.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class Templates(object):
+    """Sets up the bytecode cache of an app and the fragment() template global.
+
+    TEMPLATE_BYTECODE_CACHE_DIR is relative to the instance folder, or None
+    to compile in every worker. FRAGMENT_CACHE_MAX_ENTRIES and
+    FRAGMENT_CACHE_TTL bound the fragments kept by each worker.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        directory = app.config["TEMPLATE_BYTECODE_CACHE_DIR"]
+        if directory:
+            directory = os.path.join(app.instance_path, directory)
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                # templates are then compiled by each worker as without the cache
+                logger.warning("template bytecode cache disabled: %s", e)
+            else:
+                app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+        app.extensions['fragments'] = LRUCache(app.config["FRAGMENT_CACHE_MAX_ENTRIES"],
+                                               app.config["FRAGMENT_CACHE_TTL"])
+        app.add_template_global(self.fragment)
+
+    def fragment(self, *key, caller):
+        """Return the body of the calling block as rendered for key, rendering it on a miss."""
+        fragments = current_app.extensions['fragments']
+        body = fragments.get(key)
+        if body is None:
+            body = caller()
+            fragments.set(key, body)
+        return body
+
+
+def compile_templates(app):
+    """Compile every HTML template of app into its bytecode cache and return their names."""
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
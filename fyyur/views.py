@@ -1,38 +1,177 @@
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
 
-import babel
-import dateutil.parser
-import pandas as pd
 import pytz
-from flask import flash, redirect, render_template, request, url_for
-from sqlalchemy.sql import func
-
-from fyyur import app, db
-from fyyur.forms import ArtistForm, ShowForm, VenueForm
+from flask import (Blueprint, Response, abort, current_app, flash, jsonify, redirect,
+                   render_template, request, stream_with_context, url_for)
+
+from fyyur import cache, db, jobs, metrics, replicas, scheduling
+from fyyur.bulk import MODELS, iter_export
+from fyyur.conditional import conditional, make_etag
+from fyyur.filters import format_datetime
+from fyyur.forms import GENRES, ArtistForm, ShowBatchForm, ShowForm, VenueForm
 from fyyur.models import Artist, Show, Venue
+from fyyur.purge import purge, soft_delete
+from fyyur.queries import (artist_shows, artist_version, artists_page, entity_fields,
+                           genre_counts, genre_page, iter_artists, iter_shows, live,
+                           next_rollover, schedule_page, search_names, shows_page, venue_areas,
+                           venue_shows, venue_version)
+
+# every route of the site; registered on the app by create_app()
+bp = Blueprint('main', __name__)
 
 # ----------------------------------------------------------------------------#
 #  Jinja Filters.
 # ----------------------------------------------------------------------------#
 
+bp.add_app_template_filter(format_datetime, 'datetime')
+
+# ----------------------------------------------------------------------------#
+#  Helpers.
+# ----------------------------------------------------------------------------#
+
+
+def search_page_args():
+    """Read the page and limit of a search request, bounded by the configured maximum."""
+    page = max(request.values.get('page', 1, type=int), 1)
+    limit = request.values.get('limit', current_app.config["SEARCH_RESULTS_LIMIT"], type=int)
+    limit = min(max(limit, 1), current_app.config["SEARCH_RESULTS_MAX_LIMIT"])
+    return page, limit
+
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+def list_cursor_args(*parsers):
+    """Read the keyset cursor of a listing request as a tuple of values.
+
+    The cursor is sent as the key values of the last row seen joined by '|';
+    parsers convert each value back to the type of its key column.
+    """
+    after = request.args.get('after')
+    if not after:
+        return None
+    values = after.split('|')
+    if len(values) != len(parsers):
+        abort(400)
+    try:
+        return tuple(parse(value) for parse, value in zip(parsers, values))
+    except ValueError:
+        abort(400)
 
 
-app.jinja_env.filters['datetime'] = format_datetime
+def next_page_url(endpoint, next_after, **values):
+    if next_after is None:
+        return None
+    return url_for(endpoint, after='|'.join(
+        value.isoformat() if isinstance(value, datetime) else str(value) for value in next_after),
+                   **values)
+
+
+def schedule_range_args():
+    """Read the first and last day of a schedule request, the coming week by default.
+
+    Both are ISO dates and days run from midnight to midnight UTC.
+    """
+    try:
+        first = date.fromisoformat(request.args.get('from') or
+                                   datetime.now(pytz.utc).date().isoformat())
+        last = date.fromisoformat(request.args.get('to') or
+                                  (first + timedelta(days=6)).isoformat())
+    except ValueError:
+        abort(400)
+    if last < first:
+        abort(400)
+    return first, last
+
+
+def render_schedule(criteria, heading, endpoint, **values):
+    """Render the page of the shows matching criteria in the requested range with shows.html."""
+    first, last = schedule_range_args()
+    after = list_cursor_args(datetime.fromisoformat, int)
+    data, next_after = schedule_page(criteria, datetime.combine(first, time.min, pytz.utc),
+                                     datetime.combine(last + timedelta(days=1), time.min, pytz.utc),
+                                     after, current_app.config["LIST_PAGE_LIMIT"])
+    values.update({'from': first.isoformat(), 'to': last.isoformat()})
+    return render_template('pages/shows.html',
+                           heading="{}, {} to {}".format(heading, first, last),
+                           shows=data,
+                           next_url=next_page_url(endpoint, next_after, **values))
+
+
+def detail_validators(kind, entity_id, version, now):
+    """Return the conditional GET validators of a venue or artist page, None if it doesn't exist.
+
+    version is what venue_version()/artist_version() returned at now. The
+    page is last modified by the latest of the changes it reports and may be
+    kept by shared caches until its next show starts.
+    """
+    if version is None:
+        return None
+    changes, next_start = version[:-1], version[-1]
+    last_modified = max((change for change in changes if change is not None), default=None)
+    s_maxage = current_app.config["DETAIL_PAGE_S_MAXAGE"]
+    if next_start is not None:
+        s_maxage = min(s_maxage, max(int((next_start - now).total_seconds()), 0))
+    return make_etag(kind, entity_id, *changes), last_modified, s_maxage
+
+
+def venue_validators(venue_id):
+    now = datetime.now(pytz.utc)
+    return detail_validators('venue', venue_id, venue_version(venue_id, now), now)
+
+
+def artist_validators(artist_id):
+    now = datetime.now(pytz.utc)
+    return detail_validators('artist', artist_id, artist_version(artist_id, now), now)
+
+
+def purge_job(job, model, entity_id):
+    """Background job deleting the shows of a deleted venue or artist and then its row."""
+    purge(model, entity_id, current_app.config["PURGE_BATCH_SIZE"], job.progress)
+    # the show counters of the other side of its bookings went down with the shows
+    cache.invalidate('shows', 'venues', 'artists')
+
+
+def delete_entity(model, entity_id):
+    """Hide a venue or artist at once and queue the purge of its shows.
+
+    Responds 202 with the purge job, whose progress is served at its Location.
+    The response is JSON only; nothing is flashed into the session.
+    """
+    kind = model.__tablename__
+    try:
+        # a single UPDATE; its shows are hidden with it by the reads
+        deleted = soft_delete(model, entity_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify(error=str(e)), 500
+    finally:
+        db.session.close()
+    # missing, or deleted by another request
+    if not deleted:
+        abort(404)
+    cache.invalidate('{}:{}'.format(kind, entity_id), kind + 's', 'shows', 'genres')
+    job = jobs.submit("purge {} {}".format(kind, entity_id), purge_job, model, entity_id)
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = url_for('.job_status', job_id=job.id)
+    return response
+
+
+def stream_template(template_name, **context):
+    """Render a template as a generator so rows are sent while they are read."""
+    current_app.update_template_context(context)
+    template = current_app.jinja_env.get_template(template_name)
+    stream = template.stream(context)
+    # send the page in chunks of a few template statements instead of one by one
+    stream.enable_buffering(5)
+    return Response(stream_with_context(stream))
+
 
 # ----------------------------------------------------------------------------#
 #  Controllers.
 # ----------------------------------------------------------------------------#
 
 
-@app.route('/')
+@bp.route('/')
 def index():
     return render_template('pages/home.html')
 
@@ -41,83 +180,63 @@ def index():
 #  ----------------------------------------------------------------
 
 
-@app.route('/venues')
+@bp.route('/venues')
+@replicas.reads
+@cache.cached('venues', 'shows')
 def venues():
-    # substitute NULLs in state and city with N/A - this will be a group
-    city_venues = db.session.query(func.coalesce(Venue.city, 'N/A'),
-                                   func.coalesce(Venue.state, 'N/A'), func.array_agg(Venue.id),
-                                   func.array_agg(Venue.name)).group_by(Venue.city,
-                                                                        Venue.state).all()
-    data = []
-    for venue_data_tuple in city_venues:
-        city_venue_dict = {}
-        city_venue_dict["city"] = venue_data_tuple[0]
-        city_venue_dict["state"] = venue_data_tuple[1]
-        city_venue_dict["venues"] = []
-        for i in range(len(venue_data_tuple[2])):
-            venue_dict = {}
-            venue_dict["id"] = venue_data_tuple[2][i]
-            venue_dict["name"] = venue_data_tuple[3][i]
-            # count the number of shows linked to Venue that have start_time after now
-            venue_dict["num_upcoming_shows"] = sum([
-                x.start_time > datetime.now(pytz.utc)
-                for x in Venue.query.get(venue_data_tuple[2][i]).venue_shows
-            ])
-            city_venue_dict["venues"].append(venue_dict)
-        data.append(city_venue_dict)
-    return render_template('pages/venues.html', areas=data)
-
-
-@app.route('/venues/<int:venue_id>')
+    # upcoming show counts change when the rollover job moves the next show to the past
+    cache.expire_at(next_rollover())
+    # single query - upcoming show counts are read from the venue counters
+    return render_template('pages/venues.html', areas=venue_areas())
+
+
+@bp.route('/venues/<int:venue_id>')
+@replicas.reads
+@conditional(venue_validators)
+@cache.cached('venue:{venue_id}')
 def show_venue(venue_id):
-    venue_data = Venue.query.get(venue_id)
-    data = venue_data.__dict__
-    data["past_shows"] = []
-    data["upcoming_shows"] = []
-    for show in venue_data.venue_shows:
-        # show is in the past
-        if show.start_time < datetime.now(pytz.utc):
-            data["past_shows"].append({
-                "artist_id": show.artist.id, "artist_name": show.artist.name,
-                "artist_image_link": show.artist.image_link,
-                "start_time": show.start_time.strftime("%Y-%m-%dT%X")
-            })
-        else:
-            data["upcoming_shows"].append({
-                "artist_id": show.artist.id, "artist_name": show.artist.name,
-                "artist_image_link": show.artist.image_link,
-                "start_time": show.start_time.strftime("%Y-%m-%dT%X")
-            })
-    data["past_shows_count"] = len(data["past_shows"])
-    data["upcoming_shows_count"] = len(data["upcoming_shows"])
+    venue_data = Venue.query.filter(Venue.id == venue_id, live(Venue)).first_or_404()
+    # copy so the ORM instance state is left untouched
+    data = dict(venue_data.__dict__)
+    # one reference time for the whole request
+    now = datetime.now(pytz.utc)
+    data.update(venue_shows(venue_id, now, current_app.config["DETAIL_SHOWS_LIMIT"]))
+    # the page shows the name and image of every artist listed
+    cache.tag(*{"artist:{}".format(show["artist_id"])
+                for show in data["upcoming_shows"] + data["past_shows"]})
+    cache.expire_at(data["next_show_start"])
     return render_template('pages/show_venue.html', venue=data)
 
 
-@app.route('/venues/search', methods=['POST'])
+@bp.route('/venues/<int:venue_id>/schedule')
+@replicas.reads
+@cache.cached('shows', 'venues', 'artists')
+def venue_schedule(venue_id):
+    venue = entity_fields(Venue, venue_id, ['name'])
+    if venue is None:
+        abort(404)
+    return render_schedule([Show.venue_id == venue_id], "Shows at {}".format(venue["name"]),
+                           '.venue_schedule', venue_id=venue_id)
+
+
+@bp.route('/venues/search', methods=['POST'])
+@replicas.reads
 def search_venues():
     search_term = request.form.get('search_term', '')
-    # lower to ensure case insensitive
-    venues = Venue.query.filter(func.lower(Venue.name).like("%{}%".format(
-        search_term.lower()))).all()
-    data = []
-    for venue in venues:
-        data.append({
-            "id": venue.id, "name": venue.name, "num_upcoming_shows": sum(
-                [x.start_time > datetime.now(pytz.utc) for x in venue.venue_shows])
-        })
-    response = {"count": len(venues), "data": data}
+    page, limit = search_page_args()
+    response = search_names(Venue, search_term, page, limit)
     return render_template('pages/search_venues.html',
                            results=response,
                            search_term=request.form.get('search_term', ''))
 
 
-@app.route('/venues/create', methods=['GET'])
+@bp.route('/venues/create', methods=['GET'])
 def create_venue_form():
     form = VenueForm()
     return render_template('forms/new_venue.html', form=form)
 
 
-@app.route('/venues/create', methods=['POST'])
+@bp.route('/venues/create', methods=['POST'])
 def create_venue_submission():
     try:
         new_venue_data = request.form.to_dict()
@@ -127,14 +246,16 @@ def create_venue_submission():
         new_venue_data["seeking_talent"] = new_venue_data.get("seeking_talent") == "y"
         # remove empty string values
         new_venue_data = {k: v for k, v in new_venue_data.items() if v != ''}
-        # make sure to avoid PK error with data that may already be inserted
-        new_venue_data["id"] = db.session.query(func.max(Venue.id)).first()[0] + 1
         new_venue = Venue(**new_venue_data)
         db.session.add(new_venue)
+        # id comes from the identity column and is returned by the INSERT itself
+        db.session.flush()
+        new_venue_id = new_venue.id
         db.session.commit()
+        cache.invalidate('venues', 'genres')
         # on successful db insert, flash success
-        flash('{} was successfully listed with ID {}!'.format(new_venue.name, new_venue.id))
-        return redirect(url_for('show_venue', venue_id=new_venue.id))
+        flash('{} was successfully listed with ID {}!'.format(new_venue_data["name"], new_venue_id))
+        return redirect(url_for('.show_venue', venue_id=new_venue_id))
     # rollback if fail to avoid potential implicit commits
     except Exception as e:
         db.session.rollback()
@@ -145,24 +266,14 @@ def create_venue_submission():
     return render_template('pages/home.html')
 
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@bp.route('/venues/<int:venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
-    try:
-        venue = Venue.query.get(venue_id)
-        deleted_venue_name = venue.name
-        db.session.delete(venue)
-        db.session.commit()
-        flash('{} was successfully deleted'.format(deleted_venue_name))
-    except Exception as e:
-        db.session.rollback()
-        flash("An error occurred while trying to delete {}: {}".format(venue_id, e), "error")
-    finally:
-        db.session.close()
+    return delete_entity(Venue, venue_id)
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET', 'POST'])
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET', 'POST'])
 def edit_venue(venue_id):
-    venue_to_edit = Venue.query.get(venue_id)
+    venue_to_edit = Venue.query.filter(Venue.id == venue_id, live(Venue)).first_or_404()
     # pre-populate the form with already existing venue data
     if request.method == "GET":
         # populate form with values from venue with ID <venue_id>
@@ -183,9 +294,10 @@ def edit_venue(venue_id):
                 setattr(venue_to_edit, key, value)
             # commit the updates
             db.session.commit()
+            cache.invalidate('venue:{}'.format(venue_id), 'venues', 'shows', 'genres')
             # on successful db insert, flash success
             flash('{} was successfully updated!'.format(venue_id))
-            return redirect(url_for('show_venue', venue_id=venue_id))
+            return redirect(url_for('.show_venue', venue_id=venue_id))
         except Exception as e:
             db.session.rollback()
             # on unsuccessful db insert, flash an error instead.
@@ -197,65 +309,68 @@ def edit_venue(venue_id):
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route('/artists')
+@bp.route('/artists')
+@replicas.reads
+@cache.cached('artists')
 def artists():
-    artists = Artist.query.all()
-    data = []
-    for artist in artists:
-        data.append({"id": artist.id, "name": artist.name})
-    return render_template('pages/artists.html', artists=data)
-
-
-@app.route('/artists/search', methods=['POST'])
+    after = list_cursor_args(int)
+    # stream every artist from a server-side cursor instead of paginating
+    if request.args.get('stream', type=int):
+        return stream_template('pages/artists.html',
+                               artists=iter_artists(after, current_app.config["STREAM_BATCH_SIZE"]))
+    data, next_after = artists_page(after, current_app.config["LIST_PAGE_LIMIT"])
+    return render_template('pages/artists.html',
+                           artists=data,
+                           next_url=next_page_url('.artists', next_after))
+
+
+@bp.route('/artists/search', methods=['POST'])
+@replicas.reads
 def search_artists():
     search_term = request.form.get('search_term', '')
-    # lower to ensure case insensitive
-    artists = Artist.query.filter(func.lower(Artist.name).like("%{}%".format(
-        search_term.lower()))).all()
-    data = []
-    for artist in artists:
-        data.append({
-            "id": artist.id, "name": artist.name, "num_upcoming_shows": sum(
-                [x.start_time > datetime.now(pytz.utc) for x in artist.artist_shows])
-        })
-    response = {"count": len(artists), "data": data}
+    page, limit = search_page_args()
+    response = search_names(Artist, search_term, page, limit)
     return render_template('pages/search_artists.html',
                            results=response,
                            search_term=request.form.get('search_term', ''))
 
 
-@app.route('/artists/<int:artist_id>')
+@bp.route('/artists/<int:artist_id>')
+@replicas.reads
+@conditional(artist_validators)
+@cache.cached('artist:{artist_id}')
 def show_artist(artist_id):
-    artist_data = Artist.query.get(artist_id)
-    data = artist_data.__dict__
-    data["past_shows"] = []
-    data["upcoming_shows"] = []
-    for show in artist_data.artist_shows:
-        # show is in the past
-        if show.start_time < datetime.now(pytz.utc):
-            data["past_shows"].append({
-                "venue_id": show.venue.id, "venue_name": show.venue.name,
-                "venue_image_link": show.venue.image_link,
-                "start_time": show.start_time.strftime("%Y-%m-%dT%X")
-            })
-        else:
-            data["upcoming_shows"].append({
-                "venue_id": show.venue.id, "venue_name": show.venue.name,
-                "venue_image_link": show.venue.image_link,
-                "start_time": show.start_time.strftime("%Y-%m-%dT%X")
-            })
-    data["past_shows_count"] = len(data["past_shows"])
-    data["upcoming_shows_count"] = len(data["upcoming_shows"])
+    artist_data = Artist.query.filter(Artist.id == artist_id, live(Artist)).first_or_404()
+    # copy so the ORM instance state is left untouched
+    data = dict(artist_data.__dict__)
+    # one reference time for the whole request
+    now = datetime.now(pytz.utc)
+    data.update(artist_shows(artist_id, now, current_app.config["DETAIL_SHOWS_LIMIT"]))
+    # the page shows the name and image of every venue listed
+    cache.tag(*{"venue:{}".format(show["venue_id"])
+                for show in data["upcoming_shows"] + data["past_shows"]})
+    cache.expire_at(data["next_show_start"])
     return render_template('pages/show_artist.html', artist=data)
 
 
-@app.route('/artists/create', methods=['GET'])
+@bp.route('/artists/<int:artist_id>/schedule')
+@replicas.reads
+@cache.cached('shows', 'venues', 'artists')
+def artist_schedule(artist_id):
+    artist = entity_fields(Artist, artist_id, ['name'])
+    if artist is None:
+        abort(404)
+    return render_schedule([Show.artist_id == artist_id], "Shows of {}".format(artist["name"]),
+                           '.artist_schedule', artist_id=artist_id)
+
+
+@bp.route('/artists/create', methods=['GET'])
 def create_artist_form():
     form = ArtistForm()
     return render_template('forms/new_artist.html', form=form)
 
 
-@app.route('/artists/create', methods=['POST'])
+@bp.route('/artists/create', methods=['POST'])
 def create_artist_submission():
     try:
         new_artist_data = request.form.to_dict()
@@ -265,14 +380,17 @@ def create_artist_submission():
         new_artist_data["seeking_venue"] = new_artist_data.get("seeking_venue") == "y"
         # remove empty string values
         new_artist_data = {k: v for k, v in new_artist_data.items() if v != ''}
-        # make sure to avoid PK error with data that may already be inserted
-        new_artist_data["id"] = db.session.query(func.max(Artist.id)).first()[0] + 1
         new_artist = Artist(**new_artist_data)
         db.session.add(new_artist)
+        # id comes from the identity column and is returned by the INSERT itself
+        db.session.flush()
+        new_artist_id = new_artist.id
         db.session.commit()
+        cache.invalidate('artists', 'genres')
         # on successful db insert, flash success
-        flash('{} was successfully listed with ID {}!'.format(new_artist.name, new_artist.id))
-        return redirect(url_for('show_artist', artist_id=new_artist.id))
+        flash('{} was successfully listed with ID {}!'.format(new_artist_data["name"],
+                                                              new_artist_id))
+        return redirect(url_for('.show_artist', artist_id=new_artist_id))
     # rollback if fail to avoid potential implicit commits
     except Exception as e:
         db.session.rollback()
@@ -283,9 +401,9 @@ def create_artist_submission():
     return render_template('pages/home.html')
 
 
-@app.route('/artists/<int:artist_id>/edit', methods=['GET', 'POST'])
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET', 'POST'])
 def edit_artist(artist_id):
-    artist_to_edit = Artist.query.get(artist_id)
+    artist_to_edit = Artist.query.filter(Artist.id == artist_id, live(Artist)).first_or_404()
     # pre-populate the form with already existing venue data
     if request.method == "GET":
         # populate form with values from venue with ID <venue_id>
@@ -306,9 +424,10 @@ def edit_artist(artist_id):
                 setattr(artist_to_edit, key, value)
             # commit the updates
             db.session.commit()
+            cache.invalidate('artist:{}'.format(artist_id), 'artists', 'shows', 'genres')
             # on successful db insert, flash success
             flash('{} was successfully updated!'.format(artist_id))
-            return redirect(url_for('show_artist', artist_id=artist_id))
+            return redirect(url_for('.show_artist', artist_id=artist_id))
         except Exception as e:
             db.session.rollback()
             # on unsuccessful db insert, flash an error instead.
@@ -318,61 +437,103 @@ def edit_artist(artist_id):
         return render_template('pages/home.html')
 
 
-@app.route('/artists/<artist_id>', methods=['DELETE'])
+@bp.route('/artists/<int:artist_id>', methods=['DELETE'])
 def delete_artist(artist_id):
-    try:
-        artist = Artist.query.get(artist_id)
-        deleted_artist_name = artist.name
-        db.session.delete(artist)
-        db.session.commit()
-        flash('{} was successfully deleted'.format(deleted_artist_name))
-    except Exception as e:
-        db.session.rollback()
-        flash("An error occurred while trying to delete {}: {}".format(artist_id, e), "error")
-    finally:
-        db.session.close()
+    return delete_entity(Artist, artist_id)
+
+
+#  Genres
+#  ----------------------------------------------------------------
+
+
+def cached_genre_counts():
+    # aggregated over every venue and artist, so shared by all genre pages until a write
+    return cache.memoize('genre_counts', genre_counts, 'genres')
+
+
+@bp.route('/genres')
+@replicas.reads
+@cache.cached('genres')
+def genres():
+    counts = cached_genre_counts()
+    return render_template('pages/genres.html', genres=[{
+        "name": genre, "num_venues": counts.get(genre, (0, 0))[0],
+        "num_artists": counts.get(genre, (0, 0))[1]
+    } for genre, _ in GENRES])
+
+
+@bp.route('/genres/<genre>/<any(venues, artists):kind>')
+@replicas.reads
+# the listed venues and artists carry their upcoming show counters
+@cache.cached('genres', '{kind}', 'shows')
+def genre(genre, kind):
+    if genre not in dict(GENRES):
+        abort(404)
+    cache.expire_at(next_rollover())
+    after = list_cursor_args(int)
+    data, next_after = genre_page(MODELS[kind], genre, after, current_app.config["LIST_PAGE_LIMIT"])
+    count = cached_genre_counts().get(genre, (0, 0))[0 if kind == 'venues' else 1]
+    return render_template('pages/genre.html', genre=genre, kind=kind, count=count, items=data,
+                           next_url=next_page_url('.genre', next_after, genre=genre, kind=kind))
 
 
 #  Shows
 #  ----------------------------------------------------------------
-@app.route('/shows')
+@bp.route('/shows')
+@replicas.reads
+@cache.cached('shows', 'venues', 'artists')
 def shows():
-    shows = Show.query.all()
-    data = []
-    for show in shows:
-        data.append({
-            "venue_id": show.venue_id, "venue_name": show.venue.name, "artist_id": show.artist_id,
-            "artist_name": show.artist.name, "artist_image_link": show.artist.image_link,
-            "start_time": show.start_time.strftime("%Y-%m-%dT%X")
-        })
-    return render_template('pages/shows.html', shows=data)
-
-
-@app.route('/shows/create')
+    after = list_cursor_args(datetime.fromisoformat, int)
+    # stream every show from a server-side cursor instead of paginating
+    if request.args.get('stream', type=int):
+        return stream_template('pages/shows.html',
+                               shows=iter_shows(after, current_app.config["STREAM_BATCH_SIZE"]))
+    data, next_after = shows_page(after, current_app.config["LIST_PAGE_LIMIT"])
+    return render_template('pages/shows.html',
+                           shows=data,
+                           next_url=next_page_url('.shows', next_after))
+
+
+@bp.route('/shows/schedule')
+@replicas.reads
+@cache.cached('shows', 'venues', 'artists')
+def shows_schedule():
+    # shows at the venues of one city and/or state, anywhere by default
+    area = {key: request.args[key] for key in ('city', 'state') if request.args.get(key)}
+    criteria = [getattr(Venue, key) == value for key, value in area.items()]
+    heading = "Shows in {}".format(", ".join(area.values())) if area else "Shows"
+    return render_schedule(criteria, heading, '.shows_schedule', **area)
+
+
+@bp.route('/shows/create')
 def create_shows():
     # renders form. do not touch.
     form = ShowForm()
     return render_template('forms/new_show.html', form=form)
 
 
-@app.route('/shows/create', methods=['POST'])
+@bp.route('/shows/create', methods=['POST'])
 def create_show_submission():
-    import pdb
-    pdb.set_trace()
+    # the forms of the site are rendered without a CSRF token
+    form = ShowForm(request.form, meta={'csrf': False})
+    # the artist and the venue must exist and not be deleted
+    if not form.validate():
+        return render_template('forms/new_show.html', form=form), 400
     try:
-        new_show_data = request.form.to_dict()
-        new_show_data["artist_id"] = int(new_show_data["artist_id"])
-        new_show_data["venue_id"] = int(new_show_data["venue_id"])
-        new_show_data["start_time"] = pd.Timestamp(
-            new_show_data["start_time"], tz=new_show_data.pop("time_zone")).strftime("%Y-%m-%d %X %z")
-        # make sure to avoid PK error with data that may already be inserted
-        new_show_data["id"] = db.session.query(func.max(Show.id)).first()[0] + 1
-        new_show = Show(**new_show_data)
+        venue_id = int(form.venue_id.data)
+        artist_id = int(form.artist_id.data)
+        # interpret the entered wall clock time in the chosen time zone
+        start_time = pytz.timezone(form.time_zone.data).localize(form.start_time.data)
+        new_show = Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time)
         db.session.add(new_show)
+        # id comes from the identity column and is returned by the INSERT itself
+        db.session.flush()
+        new_show_id = new_show.id
         db.session.commit()
+        cache.invalidate('shows', 'venue:{}'.format(venue_id), 'artist:{}'.format(artist_id))
         # on successful db insert, flash success
-        flash('New show was successfully listed with ID {}!'.format(new_show.id))
-        return redirect(url_for('shows'))
+        flash('New show was successfully listed with ID {}!'.format(new_show_id))
+        return redirect(url_for('.shows'))
     # rollback if fail to avoid potential implicit commits
     except Exception as e:
         db.session.rollback()
@@ -383,11 +544,108 @@ def create_show_submission():
     return render_template('pages/home.html')
 
 
-@app.errorhandler(404)
+@bp.route('/shows/batch')
+def create_show_batch():
+    return render_template('forms/new_show_batch.html', form=ShowBatchForm(), rows=None)
+
+
+@bp.route('/shows/batch', methods=['POST'])
+def create_show_batch_submission():
+    form = ShowBatchForm(request.form)
+    max_rows = current_app.config["SHOW_BATCH_MAX_ROWS"]
+    rows = None
+    try:
+        time_zone = request.form.get('time_zone', 'UTC')
+        rows = scheduling.parse_rows(request.form.get('rows', ''), time_zone)
+        if request.form.get('rule'):
+            try:
+                rows += scheduling.expand_rule(request.form.get('artist_id'),
+                                               request.form.get('venue_id'),
+                                               request.form.get('start_time'),
+                                               request.form['rule'], time_zone, max_rows)
+            except (ValueError, TypeError, OverflowError) as e:
+                flash("Invalid recurrence: {}".format(e), "error")
+                return render_template('forms/new_show_batch.html', form=form, rows=None)
+        if not rows or len(rows) > max_rows:
+            flash("A batch must have between 1 and {} shows".format(max_rows), "error")
+            return render_template('forms/new_show_batch.html', form=form, rows=None)
+        scheduling.insert(scheduling.validate(rows))
+        # one commit for the whole batch, including rows inserted one by one after a failure
+        db.session.commit()
+        listed = [row for row in rows if row.show_id is not None]
+        cache.invalidate('shows', *{'venue:{}'.format(row.venue_id) for row in listed} |
+                         {'artist:{}'.format(row.artist_id) for row in listed})
+        flash('{} shows were successfully listed, {} rejected'.format(
+            len(listed), len(rows) - len(listed)))
+    # rollback if fail to avoid potential implicit commits
+    except Exception as e:
+        db.session.rollback()
+        rows = None
+        flash("An error occurred while trying to add the shows: {}".format(e), "error")
+    finally:
+        db.session.close()
+    return render_template('forms/new_show_batch.html', form=form, rows=rows)
+
+
+#  Export
+#  ----------------------------------------------------------------
+@bp.route('/export/<kind>.<fmt>')
+@replicas.reads
+def export(kind, fmt):
+    if kind not in MODELS or fmt not in ("csv", "ndjson"):
+        abort(404)
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    # chunks are sent as they are read from a server-side cursor
+    chunks = iter_export(MODELS[kind], fmt, current_app.config["EXPORT_BATCH_SIZE"])
+    return Response(stream_with_context(chunks),
+                    mimetype=mimetype,
+                    headers={"Content-Disposition": "attachment; filename={}.{}".format(kind, fmt)})
+
+
+#  Jobs
+#  ----------------------------------------------------------------
+@bp.route('/jobs/<job_id>')
+def job_status(job_id):
+    # only the jobs queued by this worker process are known to it
+    job = jobs.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job.to_dict())
+
+
+@metrics.collector
+def job_metrics():
+    return [("fyyur_jobs_" + status, count) for status, count in jobs.stats().items()]
+
+
+#  Cache
+#  ----------------------------------------------------------------
+@bp.route('/cache/stats')
+def cache_stats():
+    return jsonify(cache.stats())
+
+
+@metrics.collector
+def cache_metrics():
+    return [("fyyur_response_cache_" + name, value) for name, value in cache.stats().items()]
+
+
+@metrics.collector
+def fragment_cache_metrics():
+    return [("fyyur_fragment_cache_" + name, value)
+            for name, value in current_app.extensions['fragments'].stats().items()]
+
+
+@metrics.collector
+def replica_metrics():
+    return [("fyyur_" + name, value) for name, value in replicas.stats().items()]
+
+
+@bp.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
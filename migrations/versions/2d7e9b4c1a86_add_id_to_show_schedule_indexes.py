@@ -0,0 +1,45 @@
+"""add id to the show schedule indexes
+
+Revision ID: 2d7e9b4c1a86
+Revises: a6d3f0c2b815
+Create Date: 2026-10-19 10:42:18.305117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d7e9b4c1a86'
+down_revision = 'a6d3f0c2b815'
+branch_labels = None
+depends_on = None
+
+# schedule pages are ordered by (start_time, id); with id in the index the keyset
+# cursor of a page is an index condition, so a venue or artist page never falls
+# back to scanning the start time index for every show of the range
+INDEXES = {
+    'ix_show_venue_id_start_time': ('ix_show_venue_id_start_time_id',
+                                    ['venue_id', 'start_time', 'id']),
+    'ix_show_artist_id_start_time': ('ix_show_artist_id_start_time_id',
+                                     ['artist_id', 'start_time', 'id']),
+}
+
+
+def upgrade():
+    # CONCURRENTLY builds without locking out writes to show, but can't run in a transaction
+    with op.get_context().autocommit_block():
+        for old_name, (name, columns) in INDEXES.items():
+            # an interrupted concurrent build leaves an invalid index behind; start over
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS {}'.format(name))
+            op.create_index(name, 'show', columns, unique=False, postgresql_concurrently=True)
+            op.drop_index(old_name, table_name='show', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for old_name, (name, columns) in INDEXES.items():
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS {}'.format(old_name))
+            op.create_index(old_name, 'show', columns[:-1], unique=False,
+                            postgresql_concurrently=True)
+            op.drop_index(name, table_name='show', postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""add trigram name indexes
+
+Revision ID: 3c9d2f1e8b47
+Revises: f9a17786049e
+Create Date: 2026-10-18 10:12:41.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9d2f1e8b47'
+down_revision = 'f9a17786049e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # trigram operator classes let GIN indexes serve ILIKE '%term%' and similarity()
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_venue_name_trgm', 'venue', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_artist_name_trgm', 'artist', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_artist_name_trgm', table_name='artist')
+    op.drop_index('ix_venue_name_trgm', table_name='venue')
+    # extension is left installed since other database objects may depend on it
@@ -0,0 +1,63 @@
+"""add shows_changed_at
+
+Revision ID: 5a0e2c9d4b17
+Revises: d15e0a7b3c68
+Create Date: 2026-10-18 19:40:11.218374
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5a0e2c9d4b17'
+down_revision = 'd15e0a7b3c68'
+branch_labels = None
+depends_on = None
+
+# show_count_shows() as created in d15e0a7b3c68, with {touch} added to the SET list
+CHANGES = {
+    'INSERT': "SELECT venue_id, artist_id, is_upcoming, 1 AS sign FROM new_shows",
+    'DELETE': "SELECT venue_id, artist_id, is_upcoming, -1 AS sign FROM old_shows",
+    'UPDATE': "SELECT venue_id, artist_id, is_upcoming, 1 AS sign FROM new_shows "
+              "UNION ALL SELECT venue_id, artist_id, is_upcoming, -1 AS sign FROM old_shows",
+}
+APPLY_CHANGES = """
+        WITH changes AS ({changes})
+        UPDATE {table} t
+        SET upcoming_shows_count = t.upcoming_shows_count + d.upcoming,
+            past_shows_count = t.past_shows_count + d.past{touch}
+        FROM (SELECT {table}_id AS id,
+                     COALESCE(SUM(sign) FILTER (WHERE is_upcoming), 0) AS upcoming,
+                     COALESCE(SUM(sign) FILTER (WHERE NOT is_upcoming), 0) AS past
+              FROM changes GROUP BY {table}_id) d
+        WHERE t.id = d.id;"""
+TOUCH = ",\n            shows_changed_at = now()"
+
+
+def create_count_function(touch):
+    branches = []
+    for operation, changes in CHANGES.items():
+        branches.append("IF TG_OP = '{}' THEN{}{}\n        END IF;".format(
+            operation, APPLY_CHANGES.format(changes=changes, table='venue', touch=touch),
+            APPLY_CHANGES.format(changes=changes, table='artist', touch=touch)))
+    op.execute("""
+    CREATE OR REPLACE FUNCTION show_count_shows() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        {}
+        RETURN NULL;
+    END $$""".format("\n        ".join(branches)))
+
+
+def upgrade():
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('shows_changed_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+    # every venue and artist whose shows change is touched by the counting trigger
+    create_count_function(TOUCH)
+
+
+def downgrade():
+    create_count_function('')
+    for table in ('artist', 'venue'):
+        op.drop_column(table, 'shows_changed_at')
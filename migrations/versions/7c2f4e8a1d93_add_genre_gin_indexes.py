@@ -0,0 +1,27 @@
+"""add genre gin indexes
+
+Revision ID: 7c2f4e8a1d93
+Revises: 5a0e2c9d4b17
+Create Date: 2026-10-18 21:06:52.403117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2f4e8a1d93'
+down_revision = '5a0e2c9d4b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the default array operator class serves containment (@>) and overlap (&&) tests
+    op.create_index('ix_venue_genres', 'venue', ['genres'], unique=False, postgresql_using='gin')
+    op.create_index('ix_artist_genres', 'artist', ['genres'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_artist_genres', table_name='artist')
+    op.drop_index('ix_venue_genres', table_name='venue')
@@ -0,0 +1,28 @@
+"""add deleted_at to venue and artist
+
+Revision ID: a6d3f0c2b815
+Revises: e4b8d2a6f051
+Create Date: 2026-10-18 23:05:47.512908
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d3f0c2b815'
+down_revision = 'e4b8d2a6f051'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # nullable without a default, so adding it doesn't rewrite the tables
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('deleted_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade():
+    for table in ('artist', 'venue'):
+        op.drop_column(table, 'deleted_at')
@@ -0,0 +1,37 @@
+"""use identity ids
+
+Revision ID: b72c4e9a1f30
+Revises: 8e41b7c05d2a
+Create Date: 2026-10-18 11:41:09.672044
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b72c4e9a1f30'
+down_revision = '8e41b7c05d2a'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venue', 'artist', 'show')
+
+
+def upgrade():
+    for table in TABLES:
+        # replace the SERIAL default with an identity column so ids come from the database
+        op.execute('ALTER TABLE "{0}" ALTER COLUMN id DROP DEFAULT'.format(table))
+        op.execute('DROP SEQUENCE IF EXISTS {0}_id_seq'.format(table))
+        op.execute('ALTER TABLE "{0}" ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY'.format(table))
+        # re-seed past rows inserted with explicit ids, e.g. by init_db.sql
+        op.execute("SELECT setval(pg_get_serial_sequence('\"{0}\"', 'id'), "
+                   "COALESCE(MAX(id), 0) + 1, false) FROM \"{0}\"".format(table))
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute('ALTER TABLE "{0}" ALTER COLUMN id DROP IDENTITY'.format(table))
+        op.execute('CREATE SEQUENCE {0}_id_seq OWNED BY "{0}".id'.format(table))
+        op.execute('ALTER TABLE "{0}" ALTER COLUMN id SET DEFAULT nextval(\'{0}_id_seq\')'.format(table))
+        op.execute("SELECT setval('{0}_id_seq', COALESCE(MAX(id), 0) + 1, false) FROM \"{0}\"".format(table))
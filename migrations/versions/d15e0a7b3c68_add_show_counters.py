@@ -0,0 +1,104 @@
+"""add show counters
+
+Revision ID: d15e0a7b3c68
+Revises: b72c4e9a1f30
+Create Date: 2026-10-18 13:25:52.804117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd15e0a7b3c68'
+down_revision = 'b72c4e9a1f30'
+branch_labels = None
+depends_on = None
+
+# rows changed by the triggering statement, +1 for new rows and -1 for old rows
+CHANGES = {
+    'INSERT': "SELECT venue_id, artist_id, is_upcoming, 1 AS sign FROM new_shows",
+    'DELETE': "SELECT venue_id, artist_id, is_upcoming, -1 AS sign FROM old_shows",
+    'UPDATE': "SELECT venue_id, artist_id, is_upcoming, 1 AS sign FROM new_shows "
+              "UNION ALL SELECT venue_id, artist_id, is_upcoming, -1 AS sign FROM old_shows",
+}
+APPLY_CHANGES = """
+        WITH changes AS ({changes})
+        UPDATE {table} t
+        SET upcoming_shows_count = t.upcoming_shows_count + d.upcoming,
+            past_shows_count = t.past_shows_count + d.past
+        FROM (SELECT {table}_id AS id,
+                     COALESCE(SUM(sign) FILTER (WHERE is_upcoming), 0) AS upcoming,
+                     COALESCE(SUM(sign) FILTER (WHERE NOT is_upcoming), 0) AS past
+              FROM changes GROUP BY {table}_id) d
+        WHERE t.id = d.id;"""
+
+
+def upgrade():
+    op.add_column('show', sa.Column('is_upcoming', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    op.create_index('ix_show_upcoming_start_time', 'show', ['start_time'], unique=False,
+                    postgresql_where=sa.text('is_upcoming'))
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+
+    # backfill before the triggers exist so they don't count the backfill itself
+    op.execute("UPDATE show SET is_upcoming = COALESCE(start_time > now(), false)")
+    for table in ('venue', 'artist'):
+        op.execute("""
+        UPDATE {0} t
+        SET upcoming_shows_count = d.upcoming, past_shows_count = d.past
+        FROM (SELECT {0}_id AS id,
+                     COUNT(*) FILTER (WHERE is_upcoming) AS upcoming,
+                     COUNT(*) FILTER (WHERE NOT is_upcoming) AS past
+              FROM show GROUP BY {0}_id) d
+        WHERE t.id = d.id""".format(table))
+
+    # a show is upcoming from insert until the rollover job sees its start time pass
+    op.execute("""
+    CREATE FUNCTION show_set_upcoming() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' OR NEW.start_time IS DISTINCT FROM OLD.start_time THEN
+            NEW.is_upcoming := COALESCE(NEW.start_time > now(), false);
+        END IF;
+        RETURN NEW;
+    END $$""")
+    op.execute("CREATE TRIGGER show_set_upcoming BEFORE INSERT OR UPDATE ON show "
+               "FOR EACH ROW EXECUTE PROCEDURE show_set_upcoming()")
+
+    # statement level triggers aggregate the changed rows first, so a bulk insert
+    # or a rollover updates each venue and artist once rather than once per show
+    branches = []
+    for operation, changes in CHANGES.items():
+        branches.append("IF TG_OP = '{}' THEN{}{}\n        END IF;".format(
+            operation, APPLY_CHANGES.format(changes=changes, table='venue'),
+            APPLY_CHANGES.format(changes=changes, table='artist')))
+    op.execute("""
+    CREATE FUNCTION show_count_shows() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        {}
+        RETURN NULL;
+    END $$""".format("\n        ".join(branches)))
+    op.execute("CREATE TRIGGER show_count_inserted AFTER INSERT ON show "
+               "REFERENCING NEW TABLE AS new_shows "
+               "FOR EACH STATEMENT EXECUTE PROCEDURE show_count_shows()")
+    op.execute("CREATE TRIGGER show_count_updated AFTER UPDATE ON show "
+               "REFERENCING OLD TABLE AS old_shows NEW TABLE AS new_shows "
+               "FOR EACH STATEMENT EXECUTE PROCEDURE show_count_shows()")
+    op.execute("CREATE TRIGGER show_count_deleted AFTER DELETE ON show "
+               "REFERENCING OLD TABLE AS old_shows "
+               "FOR EACH STATEMENT EXECUTE PROCEDURE show_count_shows()")
+
+
+def downgrade():
+    op.execute('DROP TRIGGER show_count_deleted ON show')
+    op.execute('DROP TRIGGER show_count_updated ON show')
+    op.execute('DROP TRIGGER show_count_inserted ON show')
+    op.execute('DROP FUNCTION show_count_shows()')
+    op.execute('DROP TRIGGER show_set_upcoming ON show')
+    op.execute('DROP FUNCTION show_set_upcoming()')
+    for table in ('artist', 'venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
+    op.drop_index('ix_show_upcoming_start_time', table_name='show')
+    op.drop_column('show', 'is_upcoming')
@@ -0,0 +1,36 @@
+"""add show schedule indexes
+
+Revision ID: e4b8d2a6f051
+Revises: 7c2f4e8a1d93
+Create Date: 2026-10-18 22:14:09.671240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8d2a6f051'
+down_revision = '7c2f4e8a1d93'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_show_venue_id_start_time': ['venue_id', 'start_time'],
+    'ix_show_artist_id_start_time': ['artist_id', 'start_time'],
+}
+
+
+def upgrade():
+    # CONCURRENTLY builds without locking out writes to show, but can't run in a transaction
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            # an interrupted concurrent build leaves an invalid index behind; start over
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS {}'.format(name))
+            op.create_index(name, 'show', columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name='show', postgresql_concurrently=True)
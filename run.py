@@ -4,7 +4,9 @@ It gets a copy of the app from your package and runs it.
 This won’t be used in production, but it will see a lot of mileage in development.
 """
 # Run a test server.
-from fyyur import app
+from fyyur import create_app
+
+app = create_app()
 
 
 # ----------------------------------------------------------------------------#
@@ -0,0 +1,129 @@
+"""
+Fixtures of the test suite.
+The tests run against the Postgres database named by FYYUR_TEST_DATABASE_URI,
+which is migrated to the latest revision first, and are skipped when it is
+not set. They add the rows they need and don't expect the tables to be
+empty, so any development database will do:
+
+    FYYUR_TEST_DATABASE_URI=postgresql://localhost/fyyur_test python -m pytest
+"""
+import os
+from itertools import count
+
+import pytest
+from flask import g, request_started
+from flask_migrate import upgrade
+
+from fyyur import cache, create_app, db
+from fyyur.counters import rollover
+from fyyur.models import Artist, Show, Venue
+from fyyur.nplusone import query_budget as nplusone_query_budget
+
+DATABASE_URI = os.environ.get("FYYUR_TEST_DATABASE_URI")
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "migrations")
+
+# names of the rows added by the tests, unique within a run
+_serial = count()
+
+
+def make_config(**overrides):
+    """Return the configuration of a test app, with overrides applied."""
+    return dict({
+        "SQLALCHEMY_DATABASE_URI": DATABASE_URI,
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        "SECRET_KEY": "test",
+        "TESTING": True,
+        # compile templates in memory rather than into the instance folder
+        "TEMPLATE_BYTECODE_CACHE_DIR": None,
+    }, **overrides)
+
+
+@pytest.fixture(scope="session")
+def database():
+    if not DATABASE_URI:
+        pytest.skip("FYYUR_TEST_DATABASE_URI is not set")
+    app = create_app(make_config())
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+        db.engine.dispose()
+
+
+def _reset_g(sender, **extra):
+    g._get_current_object().__dict__.clear()
+
+
+@pytest.fixture
+def app(database):
+    """An app on the test database, with its app context pushed.
+
+    Requests of the test client reuse that context; each starts with an
+    empty g, as it would in a context of its own.
+    """
+    app = create_app(make_config())
+    request_started.connect(_reset_g, app)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _add(row):
+    db.session.add(row)
+    db.session.commit()
+    return row.id
+
+
+@pytest.fixture
+def add_venue(app):
+    """Return a function adding a venue with the given columns and returning its id."""
+    def add_venue(**columns):
+        number = next(_serial)
+        return _add(Venue(**dict({
+            "name": "Test Venue {}".format(number), "city": "Testville", "state": "CA",
+            "address": "{} Test St".format(number), "genres": ["Jazz"], "seeking_talent": False
+        }, **columns)))
+
+    return add_venue
+
+
+@pytest.fixture
+def add_artist(app):
+    """Return a function adding an artist with the given columns and returning its id."""
+    def add_artist(**columns):
+        return _add(Artist(**dict({
+            "name": "Test Artist {}".format(next(_serial)), "city": "Testville", "state": "CA",
+            "genres": ["Jazz"], "seeking_venue": False
+        }, **columns)))
+
+    return add_artist
+
+
+@pytest.fixture
+def add_show(app):
+    """Return a function adding a show and returning its id."""
+    def add_show(venue_id, artist_id, start_time):
+        return _add(Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time))
+
+    return add_show
+
+
+@pytest.fixture
+def query_budget(app):
+    """Return fyyur.nplusone.query_budget, first rolling over started shows and clearing the cache.
+
+    The requests of the block then render their pages from the database, as
+    cacheable pages with no started show waiting for the rollover job.
+    """
+    def query_budget(max_queries, threshold=3):
+        # requests share the test's session; start a transaction of its own for now()
+        db.session.rollback()
+        rollover()
+        cache.backend.clear()
+        return nplusone_query_budget(max_queries, threshold)
+
+    return query_budget
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import pytz
+from werkzeug.http import http_date
+
+from fyyur import db
+from fyyur.models import Venue
+from fyyur.nplusone import query_budget
+
+START = datetime(2036, 1, 1, 20, tzinfo=pytz.utc)
+
+
+def test_last_modified_moves_with_the_shows(client, add_venue, add_artist, add_show):
+    venue_id = add_venue()
+    add_show(venue_id, add_artist(), START)
+    response = client.get('/api/v1/venues/{}'.format(venue_id))
+    assert response.json["upcoming_shows_count"] == 1
+    # the show was added after the venue, without updating it
+    venue = Venue.query.get(venue_id)
+    assert venue.shows_changed_at > venue.time_created
+    assert response.headers["Last-Modified"] == http_date(venue.shows_changed_at)
+
+
+def test_entities_without_modification_times_are_served(client, add_venue):
+    venue_id = add_venue()
+    # as loaded by COPY
+    db.session.execute("UPDATE venue SET time_created = NULL, time_updated = NULL, "
+                       "shows_changed_at = NULL WHERE id = :id", {"id": venue_id})
+    db.session.commit()
+    url = '/api/v1/venues/{}'.format(venue_id)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert "Last-Modified" not in response.headers
+    etag = response.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_show_fields_are_selected_alone(client, add_venue, add_artist, add_show):
+    add_show(add_venue(), add_artist(), START)
+    after = "{}|0".format((START - timedelta(seconds=1)).isoformat())
+    with query_budget(3) as log:
+        response = client.get('/api/v1/shows', query_string={"fields": "venue_id",
+                                                             "after": after, "limit": 1})
+    assert response.json["data"] and set(response.json["data"][0]) == {"venue_id"}
+    statement = [key for key in log.fingerprints if "FROM show" in key][-1]
+    assert "image_link" not in statement and "artist.name" not in statement
+
+
+def test_search_links_the_next_page(client, add_venue):
+    term = "Searchable Venue {}".format(datetime.now().timestamp())
+    for number in range(3):
+        add_venue(name="{} {}".format(term, number))
+    page = client.get('/api/v1/venues/search', query_string={"q": term, "limit": 2}).json
+    assert page["count"] == 3 and len(page["data"]) == 2
+    last = client.get(page["next"]).json
+    assert len(last["data"]) == 1 and last["next"] is None
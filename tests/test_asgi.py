@@ -0,0 +1,68 @@
+import asyncio
+import importlib
+from datetime import datetime
+
+import pytest
+import pytz
+
+from fyyur import create_app, db
+
+from tests.conftest import DATABASE_URI, make_config
+
+START = datetime(2036, 3, 1, 20, 30, tzinfo=pytz.utc)
+
+
+async def get(app, path):
+    """Return the status and body of a GET of path served by the ASGI app."""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+               'headers': [], 'root_path': '', 'scheme': 'http', 'server': ('localhost', 80)},
+              receive, send)
+    await app.pool.close()
+    return messages[0]['status'], b''.join(message.get('body', b'') for message in messages[1:])
+
+
+@pytest.fixture
+def asgi(database, monkeypatch, tmp_path):
+    """The fyyur.asgi module, whose import builds an app from the deployment configuration."""
+    config = tmp_path / "config.py"
+    config.write_text("SQLALCHEMY_DATABASE_URI = {!r}\n".format(DATABASE_URI))
+    monkeypatch.setenv("APP_CONFIG_FILE", str(config))
+    try:
+        return importlib.import_module("fyyur.asgi")
+    except OSError as e:
+        # instance/config.py is missing
+        pytest.skip(str(e))
+
+
+@pytest.fixture
+def non_utc_database(app):
+    """Make New York the default TimeZone of new connections to the test database."""
+    name = db.engine.url.database
+    db.session.execute('ALTER DATABASE "{}" SET timezone = \'America/New_York\''.format(name))
+    db.session.commit()
+    db.engine.dispose()
+    yield
+    db.session.execute('ALTER DATABASE "{}" RESET timezone'.format(name))
+    db.session.commit()
+    db.engine.dispose()
+
+
+def test_both_modes_render_the_same_show_times(asgi, non_utc_database, client, add_venue,
+                                               add_artist, add_show):
+    venue_id = add_venue()
+    add_show(venue_id, add_artist(), START)
+    path = '/venues/{}'.format(venue_id)
+    flask_page = client.get(path).get_data()
+    # without fragments cached by the Flask rendering
+    async_app = asgi.AsyncApp(create_app(make_config()))
+    status, async_page = asyncio.run(get(async_app, path))
+    assert status == 200
+    assert async_page == flask_page
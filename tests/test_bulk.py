@@ -0,0 +1,15 @@
+import json
+
+
+def test_import_command_invalidates_the_listings(app, client, tmp_path, monkeypatch):
+    assert client.get('/artists').status_code == 200
+    assert client.get('/artists').headers["X-Cache"] == "HIT"
+    path = tmp_path / "artists.ndjson"
+    path.write_text(json.dumps({"name": "Imported Artist", "city": "Testville", "state": "CA",
+                                "genres": ["Jazz"], "seeking_venue": False}) + "\n")
+    # invalidated as in the cache server the workers would share
+    monkeypatch.setitem(app.config, "RESPONSE_CACHE_SERVER", ("localhost", 5050))
+    result = app.test_cli_runner().invoke(args=["data", "import", "artists", str(path)])
+    assert result.exit_code == 0, result.output
+    assert "Imported 1 artists" in result.output
+    assert client.get('/artists').headers["X-Cache"] == "MISS"
@@ -0,0 +1,43 @@
+from fyyur.cache import LRUCache
+
+
+def test_set_drops_values_computed_before_an_invalidation():
+    cache = LRUCache()
+    since = cache.clock()
+    cache.invalidate('venue:1')
+    cache.set('page', 'stale', tags=('venue:1', 'venues'), since=since)
+    assert cache.get('page') is None
+    assert cache.stats()["stale_sets"] == 1
+    # computed after the invalidation
+    cache.set('page', 'fresh', tags=('venue:1', 'venues'), since=cache.clock())
+    assert cache.get('page') == 'fresh'
+
+
+def test_set_keeps_values_whose_tags_were_not_invalidated():
+    cache = LRUCache()
+    since = cache.clock()
+    cache.invalidate('venue:2')
+    cache.set('page', 'current', tags=('venue:1', ), since=since)
+    assert cache.get('page') == 'current'
+
+
+def test_forgotten_invalidations_make_older_values_stale():
+    cache = LRUCache(max_entries=2)
+    since = cache.clock()
+    for number in range(3):
+        cache.invalidate('venue:{}'.format(number))
+    # venue:0 is no longer remembered, so any value from before is refused
+    cache.set('page', 'stale', tags=('venue:0', ), since=since)
+    assert cache.get('page') is None
+
+
+def test_creating_a_show_invalidates_the_genre_pages(client, add_venue, add_artist):
+    venue_id, artist_id = add_venue(genres=["Jazz"]), add_artist()
+    assert client.get('/genres/Jazz/venues').headers["X-Cache"] == "MISS"
+    assert client.get('/genres/Jazz/venues').headers["X-Cache"] == "HIT"
+    client.post('/shows/create', data={"venue_id": venue_id, "artist_id": artist_id,
+                                       "start_time": "2035-06-01 20:00",
+                                       "time_zone": "US/Pacific"})
+    # drop the success message, so the page is cached again
+    client.get('/')
+    assert client.get('/genres/Jazz/venues').headers["X-Cache"] == "MISS"
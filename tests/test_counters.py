@@ -0,0 +1,56 @@
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from fyyur import cache, db
+from fyyur.counters import rollover
+from fyyur.models import Show, Venue
+
+
+def mark_upcoming(show_id):
+    """Count a show as upcoming, as if it had started since the last rollover."""
+    db.session.execute("UPDATE show SET is_upcoming = true WHERE id = :id", {"id": show_id})
+    db.session.commit()
+
+
+def test_pages_are_not_cached_while_a_rollover_is_pending(client, add_venue, add_artist,
+                                                            add_show):
+    venue_id = add_venue()
+    show_id = add_show(venue_id, add_artist(), datetime.now(pytz.utc) - timedelta(hours=1))
+    mark_upcoming(show_id)
+    cache.invalidate('venues')
+    for _ in range(2):
+        response = client.get('/venues')
+        assert response.headers["X-Cache"] == "MISS"
+        # reading the counters writes nothing, so nothing pins the client to the primary
+        assert "Set-Cookie" not in response.headers
+    db.session.expire_all()
+    assert Show.query.get(show_id).is_upcoming
+
+    # requests share the test's session; end its transaction so that now() moves on
+    db.session.rollback()
+    assert rollover() >= 1
+    assert Venue.query.get(venue_id).upcoming_shows_count == 0
+    assert client.get('/venues').headers["X-Cache"] == "MISS"
+    assert client.get('/venues').headers["X-Cache"] == "HIT"
+
+
+def test_venues_page_expires_when_the_next_show_starts(app, client, add_venue, add_artist,
+                                                       add_show):
+    venue_id = add_venue()
+    show_id = add_show(venue_id, add_artist(), datetime.now(pytz.utc) + timedelta(seconds=2))
+    # started shows of other tests would keep the page from being cached
+    rollover()
+    cache.invalidate('venues')
+    assert client.get('/venues').headers["X-Cache"] == "MISS"
+    assert client.get('/venues').headers["X-Cache"] == "HIT"
+
+    time.sleep(2.5)
+    assert client.get('/venues').headers["X-Cache"] == "MISS"
+    db.session.rollback()
+    result = app.test_cli_runner().invoke(args=["counters", "rollover"])
+    assert result.exit_code == 0, result.output
+    db.session.expire_all()
+    assert not Show.query.get(show_id).is_upcoming
+    assert Venue.query.get(venue_id).upcoming_shows_count == 0
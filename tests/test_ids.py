@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import pytest
+
+from fyyur import db
+from fyyur.models import Artist, Show, Venue
+
+WORKERS = 8
+CREATES = 200
+
+
+def venue_form(number):
+    return {"name": "Concurrent Venue {}".format(number), "city": "Testville", "state": "CA",
+            "address": "{} Test St".format(number), "genres": ["Jazz"]}
+
+
+def artist_form(number):
+    return {"name": "Concurrent Artist {}".format(number), "city": "Testville", "state": "CA",
+            "genres": ["Jazz"]}
+
+
+@pytest.mark.parametrize("model, path, form", [
+    (Venue, '/venues/create', venue_form),
+    (Artist, '/artists/create', artist_form),
+])
+def test_concurrent_creates_get_distinct_ids(app, model, path, form):
+    def create(number):
+        response = app.test_client().post(path, data=form(number))
+        assert response.status_code == 302
+        # redirected to the page of the new row
+        return int(urlsplit(response.headers['Location']).path.rsplit('/', 1)[1])
+
+    with ThreadPoolExecutor(WORKERS) as pool:
+        ids = list(pool.map(create, range(CREATES)))
+    assert len(set(ids)) == CREATES
+    assert db.session.query(model.id).filter(model.id.in_(ids)).count() == CREATES
+
+
+def test_concurrent_show_creates_get_distinct_ids(app, add_venue, add_artist):
+    venue_id, artist_id = add_venue(), add_artist()
+    form = {"venue_id": venue_id, "artist_id": artist_id, "start_time": "2035-06-01 20:00",
+            "time_zone": "US/Pacific"}
+
+    def create(_):
+        assert app.test_client().post('/shows/create', data=form).status_code == 302
+
+    with ThreadPoolExecutor(WORKERS) as pool:
+        list(pool.map(create, range(CREATES)))
+    ids = [show_id for show_id, in db.session.query(Show.id).filter(Show.venue_id == venue_id)]
+    assert len(ids) == len(set(ids)) == CREATES
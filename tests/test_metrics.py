@@ -0,0 +1,33 @@
+import re
+
+from flask import Response, stream_with_context
+
+from fyyur import db
+
+
+def metric(client, name, endpoint):
+    """Return the value of the series name of endpoint in /metrics."""
+    text = client.get('/metrics').get_data(as_text=True)
+    match = re.search(r'^{}{{endpoint="{}"}} (\S+)$'.format(name, re.escape(endpoint)), text,
+                      re.MULTILINE)
+    return float(match.group(1)) if match else 0
+
+
+def test_statements_run_while_streaming_are_counted(app, client):
+    def chunks():
+        yield "started"
+        for _ in range(3):
+            db.session.execute("SELECT 1")
+            yield "."
+
+    app.add_url_rule('/streamed', 'streamed', lambda: Response(stream_with_context(chunks())))
+    # the statements run while the body is sent, after the view has returned
+    assert client.get('/streamed').get_data(as_text=True) == "started..."
+    assert metric(client, "fyyur_request_db_queries_sum", "streamed") == 3
+
+
+def test_slowest_statement_is_not_a_label(client):
+    client.get('/venues')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'fyyur_slowest_query_seconds{endpoint="main.venues"}' in text
+    assert 'statement=' not in text
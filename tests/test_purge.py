@@ -0,0 +1,82 @@
+import time
+from datetime import datetime
+
+import pytz
+
+from fyyur import db
+from fyyur.bulk import import_rows
+from fyyur.models import Artist, Show, Venue
+from fyyur.purge import purge, soft_delete
+
+START = datetime(2036, 2, 1, 20, tzinfo=pytz.utc)
+
+
+def add_booked_venue(add_venue, add_artist, add_show, shows):
+    """Add a venue with shows of one artist and return their ids."""
+    venue_id, artist_id = add_venue(), add_artist()
+    for day in range(shows):
+        add_show(venue_id, artist_id, START.replace(day=day + 1))
+    return venue_id, artist_id
+
+
+def wait_for(client, location):
+    for _ in range(100):
+        job = client.get(location).json
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("job {} did not finish".format(location))
+
+
+def test_deleted_venue_is_hidden_then_purged(client, add_venue, add_artist, add_show):
+    venue_id, artist_id = add_booked_venue(add_venue, add_artist, add_show, 3)
+    response = client.delete('/venues/{}'.format(venue_id))
+    assert response.status_code == 202
+    # nothing is flashed, to show up on some later page
+    with client.session_transaction() as session:
+        assert "_flashes" not in session
+    job = wait_for(client, response.headers["Location"])
+    assert job["status"] == "done" and job["done"] == job["total"] == 3
+
+    assert client.get('/venues/{}'.format(venue_id)).status_code == 404
+    db.session.expire_all()
+    assert Venue.query.get(venue_id) is None
+    assert Show.query.filter_by(venue_id=venue_id).count() == 0
+    # the artist's counters went down with the shows
+    assert Artist.query.get(artist_id).upcoming_shows_count == 0
+    assert client.delete('/venues/{}'.format(venue_id)).status_code == 404
+
+
+def test_purge_deletes_in_batches(app, add_venue, add_artist, add_show):
+    venue_id, _ = add_booked_venue(add_venue, add_artist, add_show, 5)
+    assert soft_delete(Venue, venue_id)
+    db.session.commit()
+    reports = []
+    assert purge(Venue, venue_id, 2, lambda done, total: reports.append((done, total))) == 5
+    assert reports == [(0, 5), (2, 5), (4, 5), (5, 5)]
+    assert Venue.query.get(venue_id) is None
+
+
+def test_purge_command_finishes_lost_jobs(app, add_venue, add_artist, add_show):
+    venue_id, _ = add_booked_venue(add_venue, add_artist, add_show, 3)
+    assert soft_delete(Venue, venue_id)
+    db.session.commit()
+    result = app.test_cli_runner().invoke(args=["jobs", "purge", "--batch-size", "2"])
+    assert result.exit_code == 0, result.output
+    assert "Purged venue {} and its 3 shows".format(venue_id) in result.output
+    db.session.expire_all()
+    assert Venue.query.get(venue_id) is None
+
+
+def test_venue_imported_again_under_its_id_is_rendered_afresh(client, add_venue):
+    venue_id = add_venue()
+    # its card is cached while it has never been edited
+    assert client.get('/venues/{}'.format(venue_id)).status_code == 200
+    response = client.delete('/venues/{}'.format(venue_id))
+    assert wait_for(client, response.headers["Location"])["status"] == "done"
+    row = {"id": venue_id, "name": "Reopened Venue", "city": "Testville", "state": "CA",
+           "address": "1 Reopened St", "genres": ["Jazz"], "seeking_talent": False}
+    assert list(import_rows(Venue, [row], 10)) == [(1, 0)]
+    response = client.get('/venues/{}'.format(venue_id))
+    assert b"Reopened Venue" in response.data
+    assert b"1 Reopened St" in response.data
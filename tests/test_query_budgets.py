@@ -0,0 +1,41 @@
+"""
+Statement budgets of the pages, which must not grow with the rows they list.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+# the validators, the entity, its upcoming and its past shows
+DETAIL_STATEMENTS = 4
+
+
+@pytest.mark.parametrize("kind", ["venue", "artist"])
+def test_detail_statement_count_does_not_grow_with_shows(client, query_budget, add_venue,
+                                                          add_artist, add_show, kind):
+    now = datetime.now(pytz.utc)
+    counts = []
+    for shows in (1, 10):
+        venue_id, artist_id = add_venue(), add_artist()
+        # past and upcoming shows, each with a venue or an artist of its own
+        for day in range(-shows // 2, shows - shows // 2):
+            if kind == "venue":
+                add_show(venue_id, add_artist(), now + timedelta(days=day))
+            else:
+                add_show(add_venue(), artist_id, now + timedelta(days=day))
+        entity_id = venue_id if kind == "venue" else artist_id
+        with query_budget(DETAIL_STATEMENTS) as log:
+            assert client.get('/{}s/{}'.format(kind, entity_id)).status_code == 200
+        counts.append(log.count)
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.parametrize("path, statements", [
+    ("/artists", 1),
+    ("/shows", 1),
+    # the rollover check, the genre's counts and the page
+    ("/genres/Jazz/venues", 3),
+])
+def test_listing_statement_budgets(client, query_budget, path, statements):
+    with query_budget(statements):
+        assert client.get(path).status_code == 200
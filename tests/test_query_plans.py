@@ -0,0 +1,77 @@
+"""
+The show range queries must be answered by index range scans. Sequential
+and bitmap scans are disabled while explaining, so a query falls back to
+them only when no index can serve it, whatever the size of the tables.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from fyyur import db
+from fyyur.models import Show, Venue
+from fyyur.queries import artist_shows_plan, schedule_page_plan, venue_shows_plan
+
+NOW = datetime(2035, 6, 1, 20, tzinfo=pytz.utc)
+WEEK = (NOW, NOW + timedelta(days=7))
+
+
+def explain(query):
+    """Return the plan nodes of query, outermost first."""
+    statement = query.statement.compile(dialect=db.engine.dialect)
+    connection = db.session.connection()
+    connection.execute("SET LOCAL enable_seqscan = off")
+    connection.execute("SET LOCAL enable_bitmapscan = off")
+    [[plan]] = connection.execute("EXPLAIN (FORMAT JSON) " + str(statement),
+                                  statement.params).fetchall()
+    db.session.rollback()
+    nodes, pending = [], [plan[0]["Plan"]]
+    while pending:
+        node = pending.pop(0)
+        nodes.append(node)
+        pending.extend(node.get("Plans", ()))
+    return nodes
+
+
+def range_scan(query, index):
+    """Return the index scan of query on index, failing if there is none."""
+    scans = [node for node in explain(query)
+             if node["Node Type"] in ("Index Scan", "Index Only Scan")
+             and node["Index Name"] == index]
+    assert scans, "{} is not read through {}".format(query, index)
+    return scans[0]
+
+
+def first_query(plan):
+    return next(plan)
+
+
+@pytest.mark.parametrize("criterion, index", [
+    (Show.venue_id == 1, "ix_show_venue_id_start_time_id"),
+    (Show.artist_id == 1, "ix_show_artist_id_start_time_id"),
+])
+def test_entity_schedule_is_a_range_scan(app, criterion, index):
+    for after in (None, (NOW + timedelta(days=1), 1)):
+        query = first_query(schedule_page_plan([criterion], *WEEK, after, 50))
+        scan = range_scan(query, index)
+        # both ends of the range bound the scan, not only the entity
+        assert "start_time >=" in scan["Index Cond"]
+        assert "start_time <" in scan["Index Cond"]
+
+
+def test_area_schedule_is_a_range_scan(app):
+    query = first_query(schedule_page_plan([Venue.city == "Testville"], *WEEK, None, 50))
+    scan = range_scan(query, "ix_show_start_time_id")
+    assert "start_time >=" in scan["Index Cond"]
+
+
+@pytest.mark.parametrize("shows_plan, index", [
+    (venue_shows_plan, "ix_show_venue_id_start_time_id"),
+    (artist_shows_plan, "ix_show_artist_id_start_time_id"),
+])
+def test_detail_shows_are_range_scans(app, shows_plan, index):
+    plan = shows_plan(1, NOW, 50)
+    upcoming = next(plan)
+    assert "start_time >=" in range_scan(upcoming, index)["Index Cond"]
+    past = plan.send([])
+    assert "start_time <" in range_scan(past, index)["Index Cond"]
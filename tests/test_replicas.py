@@ -0,0 +1,47 @@
+import time
+
+import pytest
+from flask import g
+
+from fyyur import cache, create_app, db, replicas
+from fyyur.models import Venue
+
+from tests.conftest import DATABASE_URI, make_config
+
+LAG = 1
+
+
+@pytest.fixture
+def replica_app(database):
+    """An app reading from the test database as its own replica."""
+    app = create_app(make_config(SQLALCHEMY_REPLICA_URIS=[DATABASE_URI],
+                                 REPLICA_READ_YOUR_WRITES_SECONDS=LAG))
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_text_and_locking_statements_go_to_the_primary(replica_app):
+    primary = db.get_engine(replica_app)
+
+    @replicas.reads
+    def view():
+        assert db.session.get_bind(clause=Venue.query.statement) is not primary
+        assert not g.get('db_wrote')
+        assert db.session.get_bind(clause=Venue.query.with_for_update().statement) is primary
+        assert db.session.get_bind(clause=db.text("SELECT 1")) is primary
+        assert g.db_wrote
+
+    with replica_app.test_request_context():
+        view()
+
+
+def test_replica_pages_are_not_cached_right_after_an_invalidation(replica_app):
+    cache.invalidate('venues')
+    # a replica lagging behind the invalidation may still serve the old page
+    assert replica_app.test_client().get('/venues').headers["X-Cache"] == "MISS"
+    assert replica_app.test_client().get('/venues').headers["X-Cache"] == "MISS"
+    time.sleep(LAG + 0.1)
+    assert replica_app.test_client().get('/venues').headers["X-Cache"] == "MISS"
+    assert replica_app.test_client().get('/venues').headers["X-Cache"] == "HIT"
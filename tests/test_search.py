@@ -0,0 +1,35 @@
+from fyyur.nplusone import query_budget
+
+
+def search_statement(client, term):
+    with query_budget(2) as log:
+        page = client.get('/api/v1/venues/search', query_string={"q": term, "limit": 2}).json
+    return page, [key for key in log.fingerprints if "FROM venue" in key][-1]
+
+
+def test_short_terms_are_listed_by_id_without_ranking(client, add_venue):
+    for _ in range(3):
+        add_venue()
+    for term in ("", "e"):
+        page, statement = search_statement(client, term)
+        assert page["count"] is None and len(page["data"]) == 2 and page["next"]
+        assert "similarity" not in statement and "OVER" not in statement
+        ids = [venue["id"] for venue in page["data"]]
+        assert ids == sorted(ids)
+        following = client.get(page["next"]).json["data"]
+        assert following and following[0]["id"] > ids[-1]
+
+
+def test_longer_terms_are_ranked_and_counted(client, add_venue):
+    add_venue(name="Rankable Hall")
+    page, statement = search_statement(client, "Rankable")
+    assert page["count"] >= 1 and "similarity" in statement
+
+
+def test_search_page_without_count(client, add_venue):
+    add_venue()
+    response = client.post('/venues/search', data={"search_term": "", "limit": 1})
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert 'Search results for ""' in body and "Number of search results" not in body
+    assert 'value="2"' in body
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import pytz
+
+from fyyur import db
+from fyyur.models import Show, Venue
+from fyyur.purge import soft_delete
+
+
+def show_form(venue_id, artist_id, start_time="2035-06-01 20:00"):
+    return {"venue_id": venue_id, "artist_id": artist_id, "start_time": start_time,
+            "time_zone": "US/Pacific"}
+
+
+def shows_of(venue_id):
+    return Show.query.filter(Show.venue_id == venue_id).all()
+
+
+def test_create_show_inserts_the_validated_show(client, add_venue, add_artist):
+    venue_id, artist_id = add_venue(), add_artist()
+    response = client.post('/shows/create', data=show_form(venue_id, artist_id))
+    assert response.status_code == 302
+    [show] = shows_of(venue_id)
+    assert show.artist_id == artist_id
+    assert show.start_time == pytz.timezone("US/Pacific").localize(datetime(2035, 6, 1, 20))
+
+
+def test_create_show_rejects_an_unknown_artist(client, add_venue, add_artist):
+    venue_id = add_venue()
+    unknown_artist_id = add_artist() + 1000000
+    response = client.post('/shows/create', data=show_form(venue_id, unknown_artist_id))
+    assert response.status_code == 400
+    assert b"Artist ID does not exist" in response.data
+    assert shows_of(venue_id) == []
+
+
+def test_create_show_rejects_a_deleted_venue(client, add_venue, add_artist):
+    venue_id, artist_id = add_venue(), add_artist()
+    soft_delete(Venue, venue_id)
+    db.session.commit()
+    response = client.post('/shows/create', data=show_form(venue_id, artist_id))
+    assert response.status_code == 400
+    assert b"Venue ID does not exist" in response.data
+    assert shows_of(venue_id) == []
+
+
+def test_create_show_rejects_a_venue_deleted_after_it_was_accepted(client, add_venue,
+                                                                   add_artist):
+    venue_id, artist_id = add_venue(), add_artist()
+    assert client.post('/shows/create', data=show_form(venue_id, artist_id)).status_code == 302
+    # deleted without a request, as by another worker or a command
+    soft_delete(Venue, venue_id)
+    db.session.commit()
+    response = client.post('/shows/create',
+                           data=show_form(venue_id, artist_id, start_time="2035-06-02 20:00"))
+    assert response.status_code == 400
+    assert len(shows_of(venue_id)) == 1
+
+
+def test_create_show_rejects_an_invalid_start_time(client, add_venue, add_artist):
+    venue_id, artist_id = add_venue(), add_artist()
+    response = client.post('/shows/create',
+                           data=show_form(venue_id, artist_id, start_time="next tuesday-ish"))
+    assert response.status_code == 400
+    assert shows_of(venue_id) == []
@@ -0,0 +1,17 @@
+# the next rollover, which bounds how long the page is cached, and the venues
+VENUES_STATEMENTS = 2
+
+
+def venues_statements(client, query_budget):
+    with query_budget(VENUES_STATEMENTS) as log:
+        assert client.get('/venues').status_code == 200
+    return log.count
+
+
+def test_venues_statement_count_does_not_grow_with_venues(client, add_venue, query_budget):
+    add_venue()
+    before = venues_statements(client, query_budget)
+    # more venues, in areas of their own
+    for number in range(10):
+        add_venue(city="Test Area {}".format(number))
+    assert venues_statements(client, query_budget) == before